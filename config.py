@@ -3,18 +3,47 @@ Configuration management for Email Automation System
 """
 
 import os
+import re
+from functools import cached_property, lru_cache
 from typing import Optional
 from pydantic import Field, field_validator
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 
 
+def _parse_csv_set(value: str) -> frozenset:
+    """Parse a comma-separated env value into a lowercase frozenset
+
+    Set-valued settings are declared as plain strings because
+    pydantic-settings JSON-decodes "complex" field types (like frozenset)
+    in the dotenv source itself, before any field validator runs — so a
+    frozenset-typed field makes the documented comma format crash
+    load_config() with a SettingsError. The parsed views live in
+    cached_property accessors on Config instead.
+    """
+    return frozenset(item.strip().lower() for item in value.split(',') if item.strip())
+
+# Precompiled email-format pattern used by validate_config()
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# Accepted values for validated fields
+_VALID_LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+_VALID_OPENAI_MODELS = ('gpt-4o', 'gpt-4o-mini', 'gpt-4-turbo', 'gpt-3.5-turbo')
+
+# Fields that must be present for the system to run
+_REQUIRED_FIELDS = (
+    'openai_api_key', 'imap_host', 'imap_email', 'imap_password',
+    'smtp_host', 'smtp_email', 'smtp_password', 'google_chat_webhook_url'
+)
+
+
 class Config(BaseSettings):
     """Configuration class for Email Automation System"""
     
     # OpenAI Configuration
     openai_api_key: str = Field(..., description="OpenAI API key")
     openai_model: str = Field("gpt-4o", description="OpenAI model to use")
+    openai_model_lite: str = Field("gpt-4o-mini", description="Cheaper model for tests and other non-critical calls")
     
     # IMAP Configuration (Email Receiving)
     imap_host: str = Field(..., description="IMAP server hostname")
@@ -30,6 +59,8 @@ class Config(BaseSettings):
     smtp_email: str = Field(..., description="SMTP email address")
     smtp_password: str = Field(..., description="SMTP password or app password")
     smtp_use_tls: bool = Field(True, description="Use TLS for SMTP connection")
+    smtp_pool_size: int = Field(4, description="Number of pooled SMTP connections")
+    smtp_max_msgs_per_conn: int = Field(5000, description="Messages sent before an SMTP connection is recycled")
     
     # Google Chat Configuration
     google_chat_webhook_url: str = Field(..., description="Google Chat webhook URL")
@@ -44,33 +75,59 @@ class Config(BaseSettings):
     
     # Email Processing Configuration
     max_email_size: int = Field(10 * 1024 * 1024, description="Maximum email size in bytes (10MB)")
-    supported_attachments: list = Field([".pdf", ".doc", ".docx", ".txt", ".jpg", ".png"], description="Supported attachment types")
+    supported_attachments_raw: str = Field(
+        ".pdf,.doc,.docx,.txt,.jpg,.png",
+        validation_alias="supported_attachments",
+        description="Supported attachment types (comma-separated)"
+    )
     auto_reply_subject_prefix: str = Field("Re: ", description="Prefix for auto-reply subjects")
+    max_concurrent_processing: int = Field(8, description="Maximum emails processed concurrently")
     
     # AI Configuration
     urgency_threshold: int = Field(4, description="Urgency threshold for human escalation (1-5 scale)")
     max_response_length: int = Field(500, description="Maximum AI response length in characters")
     response_tone: str = Field("professional", description="Response tone: professional, friendly, formal")
+    batch_threshold: int = Field(20, description="Email count at which offline Batch API processing pays off")
     
     # Security Configuration
-    allowed_senders: Optional[list] = Field(None, description="List of allowed sender domains")
-    blocked_senders: Optional[list] = Field(None, description="List of blocked sender domains")
+    allowed_senders_raw: str = Field(
+        "", validation_alias="allowed_senders",
+        description="Allowed sender domains (comma-separated)"
+    )
+    blocked_senders_raw: str = Field(
+        "", validation_alias="blocked_senders",
+        description="Blocked sender domains (comma-separated)"
+    )
     require_approval_for_external: bool = Field(True, description="Require approval for external domain emails")
-    
+
+    @cached_property
+    def allowed_senders(self) -> frozenset:
+        """Allowed sender domains as a lowercase frozenset for O(1) lookups"""
+        return _parse_csv_set(self.allowed_senders_raw)
+
+    @cached_property
+    def blocked_senders(self) -> frozenset:
+        """Blocked sender domains as a lowercase frozenset for O(1) lookups"""
+        return _parse_csv_set(self.blocked_senders_raw)
+
+    @cached_property
+    def supported_attachments(self) -> frozenset:
+        """Supported attachment extensions as a lowercase frozenset"""
+        return _parse_csv_set(self.supported_attachments_raw)
+
     @field_validator('log_level')
     @classmethod
     def validate_log_level(cls, v):
-        valid_levels = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
-        if v.upper() not in valid_levels:
-            raise ValueError(f'log_level must be one of {valid_levels}')
-        return v.upper()
+        level = v.upper()
+        if level not in _VALID_LOG_LEVELS:
+            raise ValueError(f'log_level must be one of {list(_VALID_LOG_LEVELS)}')
+        return level
     
-    @field_validator('openai_model')
+    @field_validator('openai_model', 'openai_model_lite')
     @classmethod
     def validate_openai_model(cls, v):
-        valid_models = ['gpt-4o', 'gpt-4o-mini', 'gpt-4-turbo', 'gpt-3.5-turbo']
-        if v not in valid_models:
-            raise ValueError(f'openai_model must be one of {valid_models}')
+        if v not in _VALID_OPENAI_MODELS:
+            raise ValueError(f'openai_model must be one of {list(_VALID_OPENAI_MODELS)}')
         return v
     
     @field_validator('urgency_threshold')
@@ -80,15 +137,21 @@ class Config(BaseSettings):
             raise ValueError('urgency_threshold must be between 1 and 5')
         return v
     
-    model_config = {
-        "env_file": ".env",
-        "env_file_encoding": "utf-8",
-        "case_sensitive": False
-    }
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        frozen=True
+    )
 
 
+@lru_cache(maxsize=1)
 def load_config() -> Config:
-    """Load configuration from environment variables and .env file"""
+    """Load configuration from environment variables and .env file
+
+    The parsed Config is cached, so repeated calls skip re-reading .env
+    and re-validating the model. Use reload_config() to force a reload.
+    """
     try:
         # Check if .env file exists
         env_file = Path(".env")
@@ -108,14 +171,19 @@ def load_config() -> Config:
         raise
 
 
-def create_env_template():
-    """Create a template .env file with all required configuration options"""
-    template = """# Email Automation System Configuration
+def reload_config() -> Config:
+    """Clear the cached configuration and load it again"""
+    load_config.cache_clear()
+    return load_config()
+
+
+_ENV_TEMPLATE = """# Email Automation System Configuration
 # Copy this file and fill in your actual values
 
 # OpenAI Configuration
 OPENAI_API_KEY=sk-your-openai-api-key-here
 OPENAI_MODEL=gpt-4o
+OPENAI_MODEL_LITE=gpt-4o-mini
 
 # IMAP Configuration (Email Receiving)
 IMAP_HOST=imap.gmail.com
@@ -131,6 +199,8 @@ SMTP_PORT=587
 SMTP_EMAIL=your-email@domain.com
 SMTP_PASSWORD=your-app-password-here
 SMTP_USE_TLS=true
+SMTP_POOL_SIZE=4
+SMTP_MAX_MSGS_PER_CONN=5000
 
 # Google Chat Configuration
 GOOGLE_CHAT_WEBHOOK_URL=https://chat.googleapis.com/v1/spaces/your-space-id/messages
@@ -147,21 +217,28 @@ URGENT_TIMEOUT_MINUTES=10
 MAX_EMAIL_SIZE=10485760
 SUPPORTED_ATTACHMENTS=.pdf,.doc,.docx,.txt,.jpg,.png
 AUTO_REPLY_SUBJECT_PREFIX=Re: 
+MAX_CONCURRENT_PROCESSING=8
 
 # AI Configuration
 URGENCY_THRESHOLD=4
 MAX_RESPONSE_LENGTH=500
 RESPONSE_TONE=professional
+BATCH_THRESHOLD=20
 
 # Security Configuration
 ALLOWED_SENDERS=
 BLOCKED_SENDERS=
 REQUIRE_APPROVAL_FOR_EXTERNAL=true
 """
-    
-    with open(".env", "w") as f:
-        f.write(template)
-    
+
+# Encoded once at import so a fresh install writes the template in a single call
+_ENV_TEMPLATE_BYTES = _ENV_TEMPLATE.encode("utf-8")
+
+
+def create_env_template():
+    """Create a template .env file with all required configuration options"""
+    Path(".env").write_bytes(_ENV_TEMPLATE_BYTES)
+
     print("Template .env file created. Please fill in your configuration values.")
 
 
@@ -170,23 +247,15 @@ def validate_config(config: Config) -> bool:
     errors = []
     
     # Check required fields
-    required_fields = [
-        'openai_api_key', 'imap_host', 'imap_email', 'imap_password',
-        'smtp_host', 'smtp_email', 'smtp_password', 'google_chat_webhook_url'
-    ]
-    
-    for field in required_fields:
+    for field in _REQUIRED_FIELDS:
         if not getattr(config, field):
             errors.append(f"Required field '{field}' is missing or empty")
-    
+
     # Validate email addresses
-    import re
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    
-    if not re.match(email_pattern, config.imap_email):
+    if not _EMAIL_RE.fullmatch(config.imap_email):
         errors.append("Invalid IMAP email address format")
-    
-    if not re.match(email_pattern, config.smtp_email):
+
+    if not _EMAIL_RE.fullmatch(config.smtp_email):
         errors.append("Invalid SMTP email address format")
     
     # Validate ports
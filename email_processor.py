@@ -3,10 +3,12 @@ Main Email Processor - Orchestrates the entire email automation workflow
 """
 
 import asyncio
+import heapq
 import logging
+import time
+from dataclasses import asdict, astuple, dataclass
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-import json
 
 from config import Config
 from models import EmailMessage, UrgencyLevel, ResponseType, SystemStatus, ProcessingStats
@@ -17,6 +19,72 @@ from google_chat_handler import GoogleChatHandler
 from email_sender import EmailSender
 
 
+_URGENT_NOTIFICATION_TMPL = """
+🚨 URGENT EMAIL REQUIRES IMMEDIATE ATTENTION 🚨
+
+**From:** {sender}
+**Subject:** {subject}
+**Received:** {received_at}
+**Urgency Level:** {urgency} ({urgency_label})
+
+**Message Preview:**
+{body_preview}
+
+**Message ID:** {message_id}
+
+Please respond within {timeout_minutes} minutes or an automated fallback response will be sent.
+"""
+
+_APPROVAL_MESSAGE_TMPL = """
+📧 EMAIL RESPONSE REQUIRES APPROVAL
+
+**From:** {sender}
+**Subject:** {subject}
+**Received:** {received_at}
+
+**Original Message:**
+{body_preview}
+
+**Proposed AI Response:**
+{response_text}
+
+**Confidence Score:** {confidence_score:.2f}
+**Reasoning:** {reasoning}
+
+**Message ID:** {message_id}
+
+Please approve or reject this response within {timeout_minutes} minutes.
+"""
+
+
+def _preview(body: str, limit: int) -> str:
+    """Truncate an email body for notification previews.
+
+    Short bodies (the common case) are returned as-is without slicing;
+    only over-limit bodies pay for the copy.
+    """
+    if len(body) <= limit:
+        return body
+    return body[:limit] + '...'
+
+
+@dataclass(slots=True)
+class _StatsCounters:
+    """Plain counters for the processing hot path.
+
+    Incrementing a slotted dataclass attribute is a single store, unlike
+    Pydantic model attribute writes. Converted to ProcessingStats at the
+    API boundary in get_stats().
+    """
+    emails_processed: int = 0
+    ai_responses: int = 0
+    human_escalations: int = 0
+    approvals_granted: int = 0
+    approvals_denied: int = 0
+    timeouts: int = 0
+    errors: int = 0
+
+
 class EmailProcessor:
     """Main orchestrator for email automation system"""
     
@@ -34,9 +102,37 @@ class EmailProcessor:
         # System state
         self.is_running = False
         self.start_time: Optional[datetime] = None
-        self.stats = ProcessingStats()
+        self.stats = _StatsCounters()
         self.pending_approvals: Dict[str, Any] = {}
-        
+        # Min-heap of (timeout_at_mono, message_id) so the timeout loop only
+        # wakes when the earliest pending approval is actually due. Keys are
+        # time.monotonic() floats, immune to wall-clock jumps and cheaper to
+        # compare than datetimes. Entries for resolved approvals are dropped
+        # lazily on pop.
+        self._timeout_heap: list = []
+        # Caps concurrent email processing so a burst of new mail doesn't
+        # blow through OpenAI/SMTP rate limits
+        self._processing_semaphore = asyncio.Semaphore(config.max_concurrent_processing)
+        # Fire-and-forget notification sends: the processing pipeline never
+        # waits on a Chat POST whose result it doesn't use. The semaphore
+        # bounds how many detached sends run at once.
+        self._notify_sem = asyncio.Semaphore(8)
+        self._pending_notifications: set = set()
+        # In-flight _process_email tasks spawned by the IDLE callback
+        self._processing_tasks: set = set()
+        # (counters snapshot, ProcessingStats) from the last get_stats() call
+        self._stats_cache: Optional[tuple] = None
+        # (monotonic timestamp, SystemStatus) from the last get_status() call;
+        # get_status probes all four external services, so a spammy polling
+        # client must not turn into a connection storm
+        self._status_cache: Optional[tuple] = None
+
+        # State-transition events for the dashboard. Consumers (the server's
+        # WebSocket forwarder) block on this queue instead of polling, so an
+        # idle system broadcasts nothing. Bounded with drop-on-full: if no
+        # one is listening, events are expendable.
+        self.event_bus: asyncio.Queue = asyncio.Queue(maxsize=256)
+
         # Background tasks
         self.email_check_task: Optional[asyncio.Task] = None
         self.approval_timeout_task: Optional[asyncio.Task] = None
@@ -51,18 +147,27 @@ class EmailProcessor:
             
             # Start IMAP listener
             await self.imap_listener.start()
-            
-            # Start background tasks
-            self.email_check_task = asyncio.create_task(self._email_check_loop())
+
+            # Start the Google Chat outbox loop so queued notifications
+            # actually drain
+            await self.google_chat_handler.start()
+
+            # Start background tasks. New mail arrives via IMAP IDLE server
+            # push where the server supports it; idle_loop itself falls back
+            # to interval polling on servers without the capability.
+            self.email_check_task = asyncio.create_task(
+                self.imap_listener.idle_loop(self._on_new_email)
+            )
             self.approval_timeout_task = asyncio.create_task(self._approval_timeout_loop())
             
             self.is_running = True
             self.start_time = datetime.now()
             
             self.logger.info("Email Automation System started successfully")
+            self._publish('system_started')
             
         except Exception as e:
-            self.logger.error(f"Failed to start Email Automation System: {e}")
+            self.logger.error("Failed to start Email Automation System: %s", e)
             await self.stop()
             raise
     
@@ -88,117 +193,145 @@ class EmailProcessor:
                 except asyncio.CancelledError:
                     pass
             
+            # Let in-flight email processing and detached notification
+            # sends finish
+            if self._processing_tasks:
+                await asyncio.gather(*self._processing_tasks, return_exceptions=True)
+            if self._pending_notifications:
+                await asyncio.gather(*self._pending_notifications, return_exceptions=True)
+
             # Stop IMAP listener
             await self.imap_listener.stop()
-            
+
+            # Drain the Google Chat outbox and close pooled HTTP clients
+            await self.google_chat_handler.stop()
+            await self.response_generator.aclose()
+            await self.urgency_classifier.aclose()
+
             self.logger.info("Email Automation System stopped")
+            self._publish('system_stopped')
             
         except Exception as e:
-            self.logger.error(f"Error stopping Email Automation System: {e}")
+            self.logger.error("Error stopping Email Automation System: %s", e)
     
     async def _test_connections(self):
         """Test all external connections"""
         self.logger.info("Testing external connections...")
-        
-        # Test IMAP
-        try:
-            await self.imap_listener.test_connection()
-            self.logger.info("IMAP connection test passed")
-        except Exception as e:
-            self.logger.error(f"IMAP connection test failed: {e}")
-            raise
-        
-        # Test SMTP
-        try:
-            await self.email_sender.test_connection()
-            self.logger.info("SMTP connection test passed")
-        except Exception as e:
-            self.logger.error(f"SMTP connection test failed: {e}")
-            raise
-        
-        # Test OpenAI
-        try:
-            await self.urgency_classifier.test_connection()
-            self.logger.info("OpenAI connection test passed")
-        except Exception as e:
-            self.logger.error(f"OpenAI connection test failed: {e}")
-            raise
-        
-        # Test Google Chat
-        try:
-            await self.google_chat_handler.test_connection()
-            self.logger.info("Google Chat connection test passed")
-        except Exception as e:
-            self.logger.error(f"Google Chat connection test failed: {e}")
-            raise
-        
+
+        # Run all four probes concurrently; startup waits for the slowest
+        # one instead of the sum of all round trips
+        service_names = ("IMAP", "SMTP", "OpenAI", "Google Chat")
+        results = await asyncio.gather(
+            self.imap_listener.test_connection(),
+            self.email_sender.test_connection(),
+            self.urgency_classifier.test_connection(),
+            self.google_chat_handler.test_connection(),
+            return_exceptions=True
+        )
+
+        first_error = None
+        for name, result in zip(service_names, results):
+            if isinstance(result, Exception):
+                self.logger.error("%s connection test failed: %s", name, result)
+                if first_error is None:
+                    first_error = result
+            else:
+                self.logger.info("%s connection test passed", name)
+
+        if first_error:
+            raise first_error
+
         self.logger.info("All connection tests passed")
     
-    async def _email_check_loop(self):
-        """Main email checking loop"""
-        while self.is_running:
+    async def _on_new_email(self, email_msg: EmailMessage):
+        """idle_loop callback: process each delivered email concurrently.
+
+        Spawns a task per email (bounded by the processing semaphore) so a
+        burst delivered in one push doesn't serialize behind the first
+        message; _process_email handles its own errors.
+        """
+        task = asyncio.create_task(self._process_email(email_msg))
+        self._processing_tasks.add(task)
+        task.add_done_callback(self._processing_tasks.discard)
+
+
+    def _publish(self, event_type: str, **fields):
+        """Put a state-transition event on the bus, dropping it when full"""
+        try:
+            self.event_bus.put_nowait({'type': event_type, **fields})
+        except asyncio.QueueFull:
+            pass
+
+    def _fire(self, coro):
+        """Run a notification coroutine in the background, bounded and tracked"""
+        task = asyncio.create_task(self._guarded_notify(coro))
+        self._pending_notifications.add(task)
+        task.add_done_callback(self._pending_notifications.discard)
+
+    async def _guarded_notify(self, coro):
+        """Await a detached notification under the semaphore, logging failures"""
+        async with self._notify_sem:
             try:
-                # Check for new emails
-                new_emails = await self.imap_listener.get_new_emails()
-                
-                for email_msg in new_emails:
-                    await self._process_email(email_msg)
-                
-                # Wait before next check
-                await asyncio.sleep(self.config.imap_check_interval)
-                
-            except asyncio.CancelledError:
-                break
+                await coro
             except Exception as e:
-                self.logger.error(f"Error in email check loop: {e}")
-                self.stats.errors += 1
-                await asyncio.sleep(30)  # Wait longer on error
-    
+                self.logger.error("Background notification failed: %s", e)
+
     async def _process_email(self, email_msg: EmailMessage):
         """Process a single email through the automation workflow"""
         try:
-            self.logger.info(f"Processing email: {email_msg.message_id}")
-            self.stats.emails_processed += 1
-            
-            # Step 1: Classify urgency
-            urgency = await self.urgency_classifier.classify_urgency(email_msg)
-            email_msg.urgency = urgency
-            
-            self.logger.info(f"Email urgency classified as: {urgency} ({urgency_to_string(urgency)})")
-            
-            # Step 2: Route based on urgency
-            if urgency >= self.config.urgency_threshold:
-                # High urgency - escalate to human
-                await self._handle_urgent_email(email_msg)
-            else:
-                # Low urgency - generate AI response
-                await self._handle_non_urgent_email(email_msg)
-            
+            async with self._processing_semaphore:
+                self.logger.info("Processing email: %s", email_msg.message_id)
+                self.stats.emails_processed += 1
+
+                # Step 1: Classify urgency
+                urgency = await self.urgency_classifier.classify_urgency(email_msg)
+                email_msg.urgency = urgency
+
+                self.logger.info("Email urgency classified as: %s (%s)", urgency, urgency_to_string(urgency))
+
+                # Step 2: Route based on urgency
+                if urgency >= self.config.urgency_threshold:
+                    # High urgency - escalate to human
+                    await self._handle_urgent_email(email_msg)
+                else:
+                    # Low urgency - generate AI response
+                    await self._handle_non_urgent_email(email_msg)
+
+                self._publish(
+                    'email_processed',
+                    message_id=email_msg.message_id,
+                    urgency=urgency.value,
+                    stats=self.get_stats().model_dump(mode='json')
+                )
+
         except Exception as e:
-            self.logger.error(f"Error processing email {email_msg.message_id}: {e}")
+            self.logger.error("Error processing email %s: %s", email_msg.message_id, e)
             self.stats.errors += 1
     
     async def _handle_urgent_email(self, email_msg: EmailMessage):
         """Handle urgent emails by escalating to human agents"""
         try:
-            self.logger.info(f"Escalating urgent email: {email_msg.message_id}")
+            self.logger.info("Escalating urgent email: %s", email_msg.message_id)
             self.stats.human_escalations += 1
             
-            # Send notification to Google Chat
+            # Send notification to Google Chat without stalling the pipeline
             notification_message = self._create_urgent_notification(email_msg)
-            await self.google_chat_handler.send_notification(notification_message)
+            self._fire(self.google_chat_handler.send_notification(notification_message, "urgent"))
             
             # Set up approval request with timeout
+            now = datetime.now()
             approval_request = {
                 'message_id': email_msg.message_id,
                 'email': email_msg,
-                'requested_at': datetime.now(),
-                'timeout_at': datetime.now() + timedelta(minutes=self.config.urgent_timeout_minutes),
+                'requested_at': now,
+                'timeout_at': now + timedelta(minutes=self.config.urgent_timeout_minutes),
+                'timeout_at_mono': time.monotonic() + self.config.urgent_timeout_minutes * 60,
                 'status': 'pending'
             }
-            
+
             self.pending_approvals[email_msg.message_id] = approval_request
-            
+            heapq.heappush(self._timeout_heap, (approval_request['timeout_at_mono'], email_msg.message_id))
+
             # Generate fallback response for timeout
             fallback_response = await self.response_generator.generate_fallback_response(email_msg)
             
@@ -206,13 +339,13 @@ class EmailProcessor:
             approval_request['fallback_response'] = fallback_response
             
         except Exception as e:
-            self.logger.error(f"Error handling urgent email {email_msg.message_id}: {e}")
+            self.logger.error("Error handling urgent email %s: %s", email_msg.message_id, e)
             self.stats.errors += 1
     
     async def _handle_non_urgent_email(self, email_msg: EmailMessage):
         """Handle non-urgent emails with AI response generation"""
         try:
-            self.logger.info(f"Generating AI response for email: {email_msg.message_id}")
+            self.logger.info("Generating AI response for email: %s", email_msg.message_id)
             
             # Generate AI response
             ai_response = await self.response_generator.generate_response(email_msg)
@@ -225,54 +358,58 @@ class EmailProcessor:
                 await self._send_response(email_msg, ai_response, ResponseType.AI_AUTO)
             
         except Exception as e:
-            self.logger.error(f"Error handling non-urgent email {email_msg.message_id}: {e}")
+            self.logger.error("Error handling non-urgent email %s: %s", email_msg.message_id, e)
             self.stats.errors += 1
     
     def _requires_approval(self, email_msg: EmailMessage) -> bool:
         """Determine if email response requires human approval"""
+        # Domain is pre-normalized at parse time; fall back to splitting for
+        # messages constructed outside the IMAP path (e.g. test emails)
+        sender_domain = email_msg.sender_domain or email_msg.sender.rpartition('@')[2].lower()
+
         # Check if external domain requires approval
         if self.config.require_approval_for_external:
-            sender_domain = email_msg.sender.split('@')[1]
-            if sender_domain not in (self.config.allowed_senders or []):
+            if sender_domain not in self.config.allowed_senders:
                 return True
-        
+
         # Check if sender is in blocked list
-        if self.config.blocked_senders:
-            sender_domain = email_msg.sender.split('@')[1]
-            if sender_domain in self.config.blocked_senders:
-                return True
-        
+        if sender_domain in self.config.blocked_senders:
+            return True
+
         return False
     
     async def _request_approval(self, email_msg: EmailMessage, ai_response):
         """Request human approval for AI response"""
         try:
-            self.logger.info(f"Requesting approval for email: {email_msg.message_id}")
+            self.logger.info("Requesting approval for email: %s", email_msg.message_id)
             
             # Send approval request to Google Chat
             approval_message = self._create_approval_message(email_msg, ai_response)
             await self.google_chat_handler.send_approval_request(approval_message)
             
             # Set up approval request
+            now = datetime.now()
             approval_request = {
                 'message_id': email_msg.message_id,
                 'email': email_msg,
                 'ai_response': ai_response,
-                'requested_at': datetime.now(),
-                'timeout_at': datetime.now() + timedelta(minutes=self.config.urgent_timeout_minutes),
+                'requested_at': now,
+                'timeout_at': now + timedelta(minutes=self.config.urgent_timeout_minutes),
+                'timeout_at_mono': time.monotonic() + self.config.urgent_timeout_minutes * 60,
                 'status': 'pending'
             }
-            
+
             self.pending_approvals[email_msg.message_id] = approval_request
-            
+            heapq.heappush(self._timeout_heap, (approval_request['timeout_at_mono'], email_msg.message_id))
+
         except Exception as e:
-            self.logger.error(f"Error requesting approval for {email_msg.message_id}: {e}")
+            self.logger.error("Error requesting approval for %s: %s", email_msg.message_id, e)
             self.stats.errors += 1
     
     async def _send_response(self, email_msg: EmailMessage, response, response_type: ResponseType):
         """Send email response"""
         try:
-            self.logger.info(f"Sending {response_type} response for email: {email_msg.message_id}")
+            self.logger.info("Sending %s response for email: %s", response_type, email_msg.message_id)
             
             # Send the email
             success = await self.email_sender.send_response(email_msg, response)
@@ -285,64 +422,76 @@ class EmailProcessor:
                 if response_type == ResponseType.AI_AUTO:
                     self.stats.ai_responses += 1
                 
-                self.logger.info(f"Response sent successfully for email: {email_msg.message_id}")
+                self.logger.info("Response sent successfully for email: %s", email_msg.message_id)
             else:
-                self.logger.error(f"Failed to send response for email: {email_msg.message_id}")
+                self.logger.error("Failed to send response for email: %s", email_msg.message_id)
                 self.stats.errors += 1
             
         except Exception as e:
-            self.logger.error(f"Error sending response for {email_msg.message_id}: {e}")
+            self.logger.error("Error sending response for %s: %s", email_msg.message_id, e)
             self.stats.errors += 1
     
     async def _approval_timeout_loop(self):
         """Handle approval timeouts"""
         while self.is_running:
             try:
-                current_time = datetime.now()
-                timed_out_approvals = []
-                
-                for message_id, approval_request in self.pending_approvals.items():
-                    if current_time > approval_request['timeout_at']:
-                        timed_out_approvals.append(message_id)
-                
-                # Handle timed out approvals
-                for message_id in timed_out_approvals:
-                    await self._handle_approval_timeout(message_id)
-                
-                await asyncio.sleep(30)  # Check every 30 seconds
-                
+                if not self._timeout_heap:
+                    await asyncio.sleep(30)
+                    continue
+
+                # Sleep until the earliest pending timeout is due
+                wait_seconds = self._timeout_heap[0][0] - time.monotonic()
+                if wait_seconds > 0:
+                    await asyncio.sleep(wait_seconds)
+
+                # Pop everything that is now due; skip stale entries for
+                # approvals that were already resolved or refreshed.
+                now = time.monotonic()
+                expired = []
+                while self._timeout_heap and self._timeout_heap[0][0] <= now:
+                    timeout_at_mono, message_id = heapq.heappop(self._timeout_heap)
+                    approval_request = self.pending_approvals.get(message_id)
+                    if not approval_request or approval_request['timeout_at_mono'] != timeout_at_mono:
+                        continue
+                    expired.append(approval_request)
+
+                # Fallback sends are I/O bound, so handle a batch of expired
+                # approvals concurrently
+                if expired:
+                    await asyncio.gather(
+                        *(self._handle_approval_timeout(request) for request in expired)
+                    )
+
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                self.logger.error(f"Error in approval timeout loop: {e}")
+                self.logger.error("Error in approval timeout loop: %s", e)
                 await asyncio.sleep(60)
     
-    async def _handle_approval_timeout(self, message_id: str):
+    async def _handle_approval_timeout(self, approval_request: Dict[str, Any]):
         """Handle approval timeout"""
+        message_id = approval_request['message_id']
         try:
-            approval_request = self.pending_approvals.get(message_id)
-            if not approval_request:
+            # Remove from pending approvals up front; a concurrent approval
+            # decision for the same message becomes a no-op
+            if self.pending_approvals.pop(message_id, None) is None:
                 return
-            
-            self.logger.info(f"Handling approval timeout for email: {message_id}")
+
+            self.logger.info("Handling approval timeout for email: %s", message_id)
             self.stats.timeouts += 1
-            
+
             email_msg = approval_request['email']
-            
+
             # Use fallback response if available
             if 'fallback_response' in approval_request:
                 fallback_response = approval_request['fallback_response']
-                await self._send_response(email_msg, fallback_response, ResponseType.FALLBACK)
             else:
                 # Generate new fallback response
                 fallback_response = await self.response_generator.generate_fallback_response(email_msg)
-                await self._send_response(email_msg, fallback_response, ResponseType.FALLBACK)
-            
-            # Remove from pending approvals
-            del self.pending_approvals[message_id]
-            
+            await self._send_response(email_msg, fallback_response, ResponseType.FALLBACK)
+
         except Exception as e:
-            self.logger.error(f"Error handling approval timeout for {message_id}: {e}")
+            self.logger.error("Error handling approval timeout for %s: %s", message_id, e)
             self.stats.errors += 1
     
     async def approve_response(self, message_id: str, approved: bool, approved_by: str, comments: str = ""):
@@ -350,10 +499,10 @@ class EmailProcessor:
         try:
             approval_request = self.pending_approvals.get(message_id)
             if not approval_request:
-                self.logger.warning(f"No pending approval found for message: {message_id}")
+                self.logger.warning("No pending approval found for message: %s", message_id)
                 return False
             
-            self.logger.info(f"Processing approval decision for {message_id}: {approved}")
+            self.logger.info("Processing approval decision for %s: %s", message_id, approved)
             
             if approved:
                 self.stats.approvals_granted += 1
@@ -364,9 +513,9 @@ class EmailProcessor:
             else:
                 self.stats.approvals_denied += 1
                 # Send notification that response was rejected
-                await self.google_chat_handler.send_notification(
+                self._fire(self.google_chat_handler.send_notification(
                     f"Response for email {message_id} was rejected by {approved_by}. Comments: {comments}"
-                )
+                ))
             
             # Remove from pending approvals
             del self.pending_approvals[message_id]
@@ -374,24 +523,35 @@ class EmailProcessor:
             return True
             
         except Exception as e:
-            self.logger.error(f"Error processing approval for {message_id}: {e}")
+            self.logger.error("Error processing approval for %s: %s", message_id, e)
             self.stats.errors += 1
             return False
     
     async def get_status(self) -> SystemStatus:
         """Get current system status"""
         try:
-            # Test connections
-            imap_connected = await self.imap_listener.is_connected()
-            smtp_connected = await self.email_sender.is_connected()
-            openai_connected = await self.urgency_classifier.is_connected()
-            google_chat_connected = await self.google_chat_handler.is_connected()
-            
+            # Serve a recent snapshot instead of re-probing every service
+            # for each poll
+            if self._status_cache and time.monotonic() - self._status_cache[0] < 1.0:
+                return self._status_cache[1]
+
+            # Test connections concurrently
+            connection_checks = await asyncio.gather(
+                self.imap_listener.check_connection(),
+                self.email_sender.check_connection(),
+                self.urgency_classifier.check_connection(),
+                self.google_chat_handler.check_connection(),
+                return_exceptions=True
+            )
+            imap_connected, smtp_connected, openai_connected, google_chat_connected = (
+                result is True for result in connection_checks
+            )
+
             uptime = 0
             if self.start_time:
                 uptime = int((datetime.now() - self.start_time).total_seconds())
             
-            return SystemStatus(
+            status = SystemStatus(
                 is_running=self.is_running,
                 imap_connected=imap_connected,
                 smtp_connected=smtp_connected,
@@ -403,21 +563,35 @@ class EmailProcessor:
                 uptime_seconds=uptime,
                 error_count=self.stats.errors
             )
-            
+            self._status_cache = (time.monotonic(), status)
+            return status
+
         except Exception as e:
-            self.logger.error(f"Error getting system status: {e}")
+            self.logger.error("Error getting system status: %s", e)
             return SystemStatus(is_running=False)
     
     def get_stats(self) -> ProcessingStats:
         """Get processing statistics"""
+        # Reuse the last snapshot while the counters haven't moved, so
+        # polling dashboards don't trigger a rebuild per request
+        snapshot = astuple(self.stats)
+        if self._stats_cache and self._stats_cache[0] == snapshot:
+            return self._stats_cache[1].model_copy()
+
         # Calculate success rate
+        success_rate = 0.0
         total_processed = self.stats.emails_processed
         if total_processed > 0:
             successful = self.stats.ai_responses + self.stats.human_escalations
-            self.stats.success_rate = (successful / total_processed) * 100
-        
-        self.stats.last_updated = datetime.now()
-        return self.stats
+            success_rate = (successful / total_processed) * 100
+
+        stats = ProcessingStats(
+            **asdict(self.stats),
+            success_rate=success_rate,
+            last_updated=datetime.now()
+        )
+        self._stats_cache = (snapshot, stats)
+        return stats
     
     async def send_test_email(self) -> bool:
         """Send a test email to verify system functionality"""
@@ -436,60 +610,48 @@ class EmailProcessor:
             return success
             
         except Exception as e:
-            self.logger.error(f"Error sending test email: {e}")
+            self.logger.error("Error sending test email: %s", e)
             return False
     
     def _create_urgent_notification(self, email_msg: EmailMessage) -> str:
         """Create urgent email notification message"""
-        return f"""
-🚨 URGENT EMAIL REQUIRES IMMEDIATE ATTENTION 🚨
-
-**From:** {email_msg.sender}
-**Subject:** {email_msg.subject}
-**Received:** {email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S')}
-**Urgency Level:** {email_msg.urgency} ({urgency_to_string(email_msg.urgency)})
+        return _URGENT_NOTIFICATION_TMPL.format(
+            sender=email_msg.sender,
+            subject=email_msg.subject,
+            received_at=email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S'),
+            urgency=email_msg.urgency,
+            urgency_label=urgency_to_string(email_msg.urgency),
+            body_preview=_preview(email_msg.body, 200),
+            message_id=email_msg.message_id,
+            timeout_minutes=self.config.urgent_timeout_minutes
+        )
 
-**Message Preview:**
-{email_msg.body[:200]}{'...' if len(email_msg.body) > 200 else ''}
-
-**Message ID:** {email_msg.message_id}
-
-Please respond within {self.config.urgent_timeout_minutes} minutes or an automated fallback response will be sent.
-"""
-    
     def _create_approval_message(self, email_msg: EmailMessage, ai_response) -> str:
         """Create approval request message"""
-        return f"""
-📧 EMAIL RESPONSE REQUIRES APPROVAL
+        return _APPROVAL_MESSAGE_TMPL.format(
+            sender=email_msg.sender,
+            subject=email_msg.subject,
+            received_at=email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S'),
+            body_preview=_preview(email_msg.body, 300),
+            response_text=ai_response.response_text,
+            confidence_score=ai_response.confidence_score,
+            reasoning=ai_response.reasoning,
+            message_id=email_msg.message_id,
+            timeout_minutes=self.config.urgent_timeout_minutes
+        )
 
-**From:** {email_msg.sender}
-**Subject:** {email_msg.subject}
-**Received:** {email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S')}
 
-**Original Message:**
-{email_msg.body[:300]}{'...' if len(email_msg.body) > 300 else ''}
-
-**Proposed AI Response:**
-{ai_response.response_text}
-
-**Confidence Score:** {ai_response.confidence_score:.2f}
-**Reasoning:** {ai_response.reasoning}
-
-**Message ID:** {email_msg.message_id}
-
-Please approve or reject this response within {self.config.urgent_timeout_minutes} minutes.
-"""
+_URGENCY_STR = {
+    UrgencyLevel.VERY_LOW: "Very Low",
+    UrgencyLevel.LOW: "Low",
+    UrgencyLevel.MEDIUM: "Medium",
+    UrgencyLevel.HIGH: "High",
+    UrgencyLevel.URGENT: "Urgent"
+}
 
 
 def urgency_to_string(urgency: UrgencyLevel) -> str:
     """Convert urgency level to string"""
-    urgency_map = {
-        UrgencyLevel.VERY_LOW: "Very Low",
-        UrgencyLevel.LOW: "Low",
-        UrgencyLevel.MEDIUM: "Medium",
-        UrgencyLevel.HIGH: "High",
-        UrgencyLevel.URGENT: "Urgent"
-    }
-    return urgency_map.get(urgency, "Unknown")
+    return _URGENCY_STR.get(urgency, "Unknown")
 
 
@@ -4,144 +4,343 @@ Email Sender - Handles SMTP email sending
 
 import asyncio
 import logging
-import smtplib
-import ssl
+import re
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
 from typing import Optional, List, Dict, Any
 import aiosmtplib
+import orjson
 
 from config import Config
 from models import EmailMessage, AIResponse
 
 
+_TEST_EMAIL_TMPL = """
+This is a test email from the Email Automation System.
+
+System Information:
+- SMTP Host: {smtp_host}
+- SMTP Port: {smtp_port}
+- From Email: {smtp_email}
+- Test Time: {test_time}
+
+If you receive this email, the SMTP configuration is working correctly.
+
+Best regards,
+Email Automation System
+"""
+
+_DAILY_REPORT_TMPL = """
+Daily Email Automation System Report
+
+PROCESSING STATISTICS:
+- Emails Processed: {emails_processed}
+- AI Responses: {ai_responses}
+- Human Escalations: {human_escalations}
+- Approvals Granted: {approvals_granted}
+- Approvals Denied: {approvals_denied}
+- Timeouts: {timeouts}
+- Errors: {errors}
+
+PERFORMANCE METRICS:
+- Success Rate: {success_rate:.1f}%
+- Average Response Time: {avg_response_time_seconds:.1f} seconds
+- Uptime: {uptime_seconds} seconds
+
+SYSTEM STATUS:
+- IMAP: {imap}
+- SMTP: {smtp}
+- OpenAI: {openai}
+- Google Chat: {google_chat}
+
+The system is running smoothly. Great work!
+
+Best regards,
+Email Automation System
+"""
+
+
+# Leading "Subject: ..." line in an AI response; one pass extracts both
+# the subject and the remaining body
+_SUBJ_RE = re.compile(r'^Subject:\s*(.+?)\r?\n(.*)', re.S)
+
+
+def _build_rfc822(headers: Dict[str, str], body: str) -> bytes:
+    """Hand-emit an RFC 5322 message for 7-bit-clean plain-text mail.
+
+    Skips the email.mime machinery (header reparsing, Charset lookups,
+    as_bytes flattening) for the common case; callers must fall back to
+    MIMEText when the content is not pure ASCII.
+    """
+    head = "\r\n".join(f"{k}: {v}" for k, v in headers.items())
+    return head.encode('ascii') + b"\r\n\r\n" + body.encode('ascii')
+
+
+@lru_cache(maxsize=1)
+def _test_email_base(smtp_host: str, smtp_port: int, smtp_email: str) -> str:
+    """Bake the constant config fields into the test body once.
+
+    Only the timestamp varies between test emails, so it stays a
+    placeholder filled in at send time.
+    """
+    return _TEST_EMAIL_TMPL.format(
+        smtp_host=smtp_host,
+        smtp_port=smtp_port,
+        smtp_email=smtp_email,
+        test_time='{test_time}'
+    )
+
+
+@lru_cache(maxsize=4)
+def _render_daily_report(items: tuple) -> str:
+    """Render the daily report body, memoized on the stats contents"""
+    stats = dict(items)
+    return _DAILY_REPORT_TMPL.format(
+        emails_processed=stats.get('emails_processed', 0),
+        ai_responses=stats.get('ai_responses', 0),
+        human_escalations=stats.get('human_escalations', 0),
+        approvals_granted=stats.get('approvals_granted', 0),
+        approvals_denied=stats.get('approvals_denied', 0),
+        timeouts=stats.get('timeouts', 0),
+        errors=stats.get('errors', 0),
+        success_rate=stats.get('success_rate', 0),
+        avg_response_time_seconds=stats.get('avg_response_time_seconds', 0),
+        uptime_seconds=stats.get('uptime_seconds', 0),
+        imap='Connected' if stats.get('imap_connected') else 'Disconnected',
+        smtp='Connected' if stats.get('smtp_connected') else 'Disconnected',
+        openai='Connected' if stats.get('openai_connected') else 'Disconnected',
+        google_chat='Connected' if stats.get('google_chat_connected') else 'Disconnected'
+    )
+
+
+class _PooledConnection:
+    """An SMTP client checked in and out of the sender's pool"""
+
+    __slots__ = ('client', 'messages_sent', 'last_used')
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
 class EmailSender:
     """SMTP email sender for sending responses"""
-    
+
+    # Idle seconds after which a pooled connection is probed before reuse
+    KEEPALIVE_IDLE_SECONDS = 60
+
     def __init__(self, config: Config):
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.is_connected = False
-        self.smtp_client: Optional[aiosmtplib.SMTP] = None
-    
+        # Pool of persistent SMTP connections. SMTP is sequential per
+        # connection, so concurrent sends each check out their own client
+        # instead of serializing behind one. Slots start as None and are
+        # connected lazily on first use.
+        self._pool: Optional[asyncio.Queue] = None
+
+    def _init_pool(self):
+        """Create the pool with lazily-connected slots"""
+        if self._pool is None:
+            self._pool = asyncio.Queue(maxsize=self.config.smtp_pool_size)
+            for _ in range(self.config.smtp_pool_size):
+                self._pool.put_nowait(None)
+
     async def start(self):
-        """Start the email sender"""
+        """Start the email sender and pre-connect the pool"""
         try:
-            await self._connect()
+            self._init_pool()
+            # Replace the lazy placeholders with live connections up front
+            for _ in range(self.config.smtp_pool_size):
+                self._pool.get_nowait()
+            connections = await asyncio.gather(
+                *(self._create_connection() for _ in range(self.config.smtp_pool_size))
+            )
+            for conn in connections:
+                self._pool.put_nowait(conn)
             self.logger.info("Email sender started successfully")
         except Exception as e:
             self.logger.error(f"Failed to start email sender: {e}")
             raise
-    
+
     async def stop(self):
-        """Stop the email sender"""
+        """Stop the email sender and close all pooled connections"""
         try:
-            if self.smtp_client:
-                await self.smtp_client.quit()
-                self.smtp_client = None
+            if self._pool is not None:
+                while not self._pool.empty():
+                    conn = self._pool.get_nowait()
+                    if conn is not None:
+                        await self._close_connection(conn)
+                self._pool = None
             self.is_connected = False
             self.logger.info("Email sender stopped")
         except Exception as e:
             self.logger.error(f"Error stopping email sender: {e}")
-    
-    async def _connect(self):
-        """Establish SMTP connection"""
+
+    async def _create_connection(self) -> _PooledConnection:
+        """Establish one SMTP connection for the pool"""
         try:
             self.logger.info(f"Connecting to SMTP server: {self.config.smtp_host}:{self.config.smtp_port}")
-            
-            # Create SMTP client
-            self.smtp_client = aiosmtplib.SMTP(
+
+            client = aiosmtplib.SMTP(
                 hostname=self.config.smtp_host,
                 port=self.config.smtp_port,
                 use_tls=self.config.smtp_use_tls
             )
-            
+
             # Connect and login
-            await self.smtp_client.connect()
-            await self.smtp_client.login(self.config.smtp_email, self.config.smtp_password)
-            
+            await client.connect()
+            await client.login(self.config.smtp_email, self.config.smtp_password)
+
             self.is_connected = True
             self.logger.info("SMTP connection established successfully")
-            
+            return _PooledConnection(client)
+
         except Exception as e:
             self.logger.error(f"Failed to connect to SMTP server: {e}")
             self.is_connected = False
             raise
-    
+
+    async def _close_connection(self, conn: _PooledConnection):
+        """Close a pooled connection, ignoring errors on an already-dead link"""
+        try:
+            await conn.client.quit()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def _acquire(self):
+        """Check a connection out of the pool, reviving or recycling as needed"""
+        self._init_pool()
+        conn = await self._pool.get()
+        try:
+            if conn is None:
+                conn = await self._create_connection()
+            elif time.monotonic() - conn.last_used > self.KEEPALIVE_IDLE_SECONDS:
+                # Probe an idle connection once rather than per send
+                try:
+                    await conn.client.noop()
+                except Exception:
+                    self.logger.info("Idle SMTP connection dropped; reconnecting")
+                    conn = await self._create_connection()
+            yield conn
+            conn.messages_sent += 1
+            conn.last_used = time.monotonic()
+        except Exception:
+            # Connection state is unknown after an error; discard it and
+            # leave a lazy slot behind
+            if conn is not None:
+                await self._close_connection(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None and conn.messages_sent >= self.config.smtp_max_msgs_per_conn:
+                self.logger.info(f"Recycling SMTP connection after {conn.messages_sent} messages")
+                await self._close_connection(conn)
+                conn = None
+            self._pool.put_nowait(conn)
+
     async def test_connection(self):
         """Test SMTP connection"""
         try:
-            if not self.is_connected:
-                await self._connect()
-            
-            # Test by sending a simple command
-            await self.smtp_client.noop()
+            async with self._acquire():
+                pass
             self.logger.info("SMTP connection test successful")
-            
+
         except Exception as e:
             self.logger.error(f"SMTP connection test failed: {e}")
             raise
-    
+
+    async def _send_with_retry(self, msg, recipients: Optional[List[str]] = None) -> None:
+        """Send over a pooled connection, reconnecting once on a dropped link"""
+        async with self._acquire() as conn:
+            try:
+                await conn.client.send_message(msg, recipients=recipients)
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionResetError):
+                self.logger.info("SMTP connection lost mid-send; reconnecting and retrying")
+                await self._close_connection(conn)
+                replacement = await self._create_connection()
+                conn.client = replacement.client
+                conn.messages_sent = replacement.messages_sent
+                await conn.client.send_message(msg, recipients=recipients)
+
+    async def _sendmail_with_retry(self, sender: str, recipients: List[str], raw: bytes) -> None:
+        """Send pre-built message bytes, reconnecting once on a dropped link"""
+        async with self._acquire() as conn:
+            try:
+                await conn.client.sendmail(sender, recipients, raw)
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionResetError):
+                self.logger.info("SMTP connection lost mid-send; reconnecting and retrying")
+                await self._close_connection(conn)
+                replacement = await self._create_connection()
+                conn.client = replacement.client
+                conn.messages_sent = replacement.messages_sent
+                await conn.client.sendmail(sender, recipients, raw)
+
     async def send_response(self, original_email: EmailMessage, ai_response: AIResponse) -> bool:
         """Send email response"""
         try:
             self.logger.info(f"Sending response for email: {original_email.message_id}")
-            
-            if not self.is_connected:
-                await self._connect()
-            
-            # Create email message
-            msg = await self._create_response_message(original_email, ai_response)
-            
-            # Send email
-            await self.smtp_client.send_message(msg)
-            
+
+            headers, body = self._response_headers_and_body(original_email, ai_response)
+
+            # Replies are plain text and usually 7-bit clean; emit the raw
+            # RFC 5322 bytes directly and only pay for MIME when needed
+            if body.isascii() and all(v.isascii() for v in headers.values()):
+                raw = _build_rfc822(headers, body)
+                await self._sendmail_with_retry(
+                    self.config.smtp_email, [original_email.sender], raw
+                )
+            else:
+                msg = MIMEMultipart()
+                for name, value in headers.items():
+                    if name != 'Content-Type':
+                        msg[name] = value
+                msg.attach(MIMEText(body, 'plain'))
+                await self._send_with_retry(msg)
+
             self.logger.info(f"Response sent successfully for email: {original_email.message_id}")
             return True
-            
+
         except Exception as e:
             self.logger.error(f"Error sending response for {original_email.message_id}: {e}")
             return False
-    
-    async def _create_response_message(self, original_email: EmailMessage, ai_response: AIResponse) -> MIMEMultipart:
-        """Create response email message"""
-        msg = MIMEMultipart()
-        
+
+    def _response_headers_and_body(self, original_email: EmailMessage, ai_response: AIResponse):
+        """Build the reply headers and body text"""
         # Parse the AI response to extract subject and body
         response_text = ai_response.response_text
-        
+
         # Extract subject line (first line if it starts with "Subject:")
-        subject = original_email.subject
-        body = response_text
-        
-        if response_text.startswith("Subject:"):
-            lines = response_text.split('\n', 1)
-            if len(lines) > 1:
-                subject = lines[0].replace("Subject:", "").strip()
-                body = lines[1].strip()
-        
+        match = _SUBJ_RE.match(response_text)
+        if match:
+            subject = match.group(1).strip()
+            body = match.group(2).lstrip()
+        else:
+            subject = original_email.subject
+            body = response_text
+
         # Add subject prefix if configured
-        if self.config.auto_reply_subject_prefix and not subject.startswith(self.config.auto_reply_subject_prefix):
-            subject = f"{self.config.auto_reply_subject_prefix}{subject}"
-        
-        # Set headers
-        msg['From'] = self.config.smtp_email
-        msg['To'] = original_email.sender
-        msg['Subject'] = subject
-        msg['In-Reply-To'] = original_email.message_id
-        msg['References'] = original_email.message_id
-        
-        # Add body
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Add metadata headers
-        msg['X-Auto-Response'] = 'true'
-        msg['X-AI-Confidence'] = str(ai_response.confidence_score)
-        msg['X-Response-Type'] = 'ai-generated'
-        
-        return msg
+        prefix = self.config.auto_reply_subject_prefix
+        if prefix and not subject.startswith(prefix):
+            subject = prefix + subject
+
+        headers = {
+            'From': self.config.smtp_email,
+            'To': original_email.sender,
+            'Subject': subject,
+            'In-Reply-To': original_email.message_id,
+            'References': original_email.message_id,
+            'X-Auto-Response': 'true',
+            'X-AI-Confidence': str(ai_response.confidence_score),
+            'X-Response-Type': 'ai-generated',
+            'Content-Type': 'text/plain; charset="us-ascii"'
+        }
+        return headers, body
     
     async def send_test_email(self, recipient: str = None) -> bool:
         """Send a test email"""
@@ -150,36 +349,22 @@ class EmailSender:
                 recipient = self.config.smtp_email
             
             self.logger.info(f"Sending test email to: {recipient}")
-            
-            if not self.is_connected:
-                await self._connect()
-            
+
             # Create test message
             msg = MIMEMultipart()
             msg['From'] = self.config.smtp_email
             msg['To'] = recipient
             msg['Subject'] = "Email Automation System - Test Email"
             
-            body = f"""
-This is a test email from the Email Automation System.
-
-System Information:
-- SMTP Host: {self.config.smtp_host}
-- SMTP Port: {self.config.smtp_port}
-- From Email: {self.config.smtp_email}
-- Test Time: {asyncio.get_event_loop().time()}
-
-If you receive this email, the SMTP configuration is working correctly.
+            body = _test_email_base(
+                self.config.smtp_host, self.config.smtp_port, self.config.smtp_email
+            ).format(test_time=time.monotonic())
 
-Best regards,
-Email Automation System
-"""
-            
             msg.attach(MIMEText(body, 'plain'))
-            
+
             # Send email
-            await self.smtp_client.send_message(msg)
-            
+            await self._send_with_retry(msg)
+
             self.logger.info("Test email sent successfully")
             return True
             
@@ -194,21 +379,44 @@ Email Automation System
                 recipients = [self.config.smtp_email]
             
             self.logger.info(f"Sending notification email to {len(recipients)} recipients")
-            
-            if not self.is_connected:
-                await self._connect()
-            
-            # Create notification message
-            msg = MIMEMultipart()
-            msg['From'] = self.config.smtp_email
-            msg['To'] = ', '.join(recipients)
-            msg['Subject'] = f"[Email Automation] {subject}"
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Send email
-            await self.smtp_client.send_message(msg)
-            
+
+            # Only the first recipient appears in the To: header; the full
+            # list travels in the envelope (RCPT TO), BCC-style. Receiving
+            # MTAs then never re-parse a long joined address header, and it
+            # keeps the header stable for DKIM.
+            headers = {
+                'From': self.config.smtp_email,
+                'To': recipients[0],
+                'Subject': f"[Email Automation] {subject}",
+                'Content-Type': 'text/plain; charset="us-ascii"'
+            }
+
+            if body.isascii() and all(v.isascii() for v in headers.values()):
+                raw = _build_rfc822(headers, body)
+
+                def send(rcpts):
+                    return self._sendmail_with_retry(self.config.smtp_email, rcpts, raw)
+            else:
+                msg = MIMEMultipart()
+                for name, value in headers.items():
+                    if name != 'Content-Type':
+                        msg[name] = value
+                msg.attach(MIMEText(body, 'plain'))
+
+                def send(rcpts):
+                    return self._send_with_retry(msg, recipients=rcpts)
+
+            # Large recipient lists pay one RCPT round trip per address on
+            # a single connection, so fan the list out across the pool and
+            # run the transactions in parallel
+            pool_size = self.config.smtp_pool_size
+            if len(recipients) > 1 and pool_size > 1:
+                chunk_size = -(-len(recipients) // pool_size)  # ceil division
+                chunks = [recipients[i:i + chunk_size] for i in range(0, len(recipients), chunk_size)]
+                await asyncio.gather(*(send(chunk) for chunk in chunks))
+            else:
+                await send(recipients)
+
             self.logger.info("Notification email sent successfully")
             return True
             
@@ -232,12 +440,12 @@ ADDITIONAL INFORMATION:
 {error_details}
 
 EMAIL CONTEXT:
-{json.dumps(email_context, indent=2) if email_context else 'No email context available'}
+{orjson.dumps(email_context, option=orjson.OPT_INDENT_2).decode() if email_context else 'No email context available'}
 
 SYSTEM INFORMATION:
 - SMTP Host: {self.config.smtp_host}
 - SMTP Port: {self.config.smtp_port}
-- Error Time: {asyncio.get_event_loop().time()}
+- Error Time: {time.monotonic()}
 
 Please check the system logs for more detailed information.
 
@@ -257,62 +465,40 @@ Email Automation System
             self.logger.info("Sending daily report email")
             
             subject = "Email Automation System - Daily Report"
-            body = f"""
-Daily Email Automation System Report
-
-PROCESSING STATISTICS:
-- Emails Processed: {stats.get('emails_processed', 0)}
-- AI Responses: {stats.get('ai_responses', 0)}
-- Human Escalations: {stats.get('human_escalations', 0)}
-- Approvals Granted: {stats.get('approvals_granted', 0)}
-- Approvals Denied: {stats.get('approvals_denied', 0)}
-- Timeouts: {stats.get('timeouts', 0)}
-- Errors: {stats.get('errors', 0)}
+            body = _render_daily_report(tuple(sorted(stats.items())))
 
-PERFORMANCE METRICS:
-- Success Rate: {stats.get('success_rate', 0):.1f}%
-- Average Response Time: {stats.get('avg_response_time_seconds', 0):.1f} seconds
-- Uptime: {stats.get('uptime_seconds', 0)} seconds
-
-SYSTEM STATUS:
-- IMAP: {'Connected' if stats.get('imap_connected') else 'Disconnected'}
-- SMTP: {'Connected' if stats.get('smtp_connected') else 'Disconnected'}
-- OpenAI: {'Connected' if stats.get('openai_connected') else 'Disconnected'}
-- Google Chat: {'Connected' if stats.get('google_chat_connected') else 'Disconnected'}
-
-The system is running smoothly. Great work!
-
-Best regards,
-Email Automation System
-"""
-            
             return await self.send_notification_email(subject, body)
             
         except Exception as e:
             self.logger.error(f"Error sending daily report: {e}")
             return False
     
-    async def is_connected(self) -> bool:
-        """Check if SMTP connection is active"""
+    async def check_connection(self) -> bool:
+        """Check if an SMTP connection is active with a NOOP probe.
+
+        Named check_connection so it doesn't shadow the is_connected bool
+        attribute that tracks connection state.
+        """
         try:
-            if not self.smtp_client:
+            if self._pool is None:
                 return False
-            
-            # Test connection with NOOP command
-            await self.smtp_client.noop()
+
+            # Test a pooled connection with a NOOP command
+            async with self._acquire() as conn:
+                await conn.client.noop()
             return True
-            
+
         except Exception as e:
             self.logger.warning(f"SMTP connection check failed: {e}")
             self.is_connected = False
             return False
-    
+
     async def reconnect(self):
         """Reconnect to SMTP server"""
         try:
             await self.stop()
             await asyncio.sleep(1)  # Brief pause before reconnecting
-            await self._connect()
+            await self.start()
             self.logger.info("SMTP reconnected successfully")
         except Exception as e:
             self.logger.error(f"Failed to reconnect to SMTP: {e}")
@@ -326,7 +512,7 @@ Email Automation System
             'email': self.config.smtp_email,
             'use_tls': self.config.smtp_use_tls,
             'is_connected': self.is_connected,
-            'last_activity': asyncio.get_event_loop().time()
+            'last_activity': time.monotonic()
         }
 
 
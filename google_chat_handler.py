@@ -3,241 +3,510 @@ Google Chat Handler - Manages Google Chat notifications and approvals
 """
 
 import asyncio
+import copy
 import logging
-import json
+import time
+from functools import lru_cache
 from typing import Optional, Dict, Any
-import aiohttp
+import httpx
+import orjson
 from datetime import datetime
 
 from config import Config
 from models import EmailMessage, AIResponse
 
 
+_URGENT_TMPL = """
+🚨 URGENT EMAIL REQUIRES IMMEDIATE ATTENTION 🚨
+
+**From:** {sender}
+**Subject:** {subject}
+**Received:** {received_at}
+**Urgency Level:** {urgency}/5
+
+**Message Preview:**
+{body_preview}
+
+**Message ID:** {message_id}
+
+Please respond within {timeout_minutes} minutes or an automated fallback response will be sent.
+"""
+
+_APPROVAL_TMPL = """
+📧 EMAIL RESPONSE REQUIRES APPROVAL
+
+**From:** {sender}
+**Subject:** {subject}
+**Received:** {received_at}
+
+**Original Message:**
+{body_preview}
+
+**Proposed AI Response:**
+{response_text}
+
+**Confidence Score:** {confidence_score:.2f}
+**Reasoning:** {reasoning}
+
+**Message ID:** {message_id}
+"""
+
+_STATUS_TMPL = """
+📊 EMAIL AUTOMATION SYSTEM STATUS
+
+**System Status:** {running}
+**IMAP:** {imap}
+**SMTP:** {smtp}
+**OpenAI:** {openai}
+
+**Statistics:**
+- Emails Processed: {emails_processed}
+- Responses Sent: {responses_sent}
+- Uptime: {uptime_seconds} seconds
+- Errors: {error_count}
+
+**Last Updated:** {last_updated}
+"""
+
+_ERROR_ALERT_TMPL = """
+🚨 SYSTEM ERROR ALERT
+
+**Error:** {error_message}
+
+**Details:** {error_details}
+
+**Time:** {time}
+
+Please check the system logs for more information.
+"""
+
+_DAILY_SUMMARY_TMPL = """
+📈 DAILY EMAIL AUTOMATION SUMMARY
+
+**Date:** {date}
+
+**Processing Statistics:**
+- Emails Processed: {emails_processed}
+- AI Responses: {ai_responses}
+- Human Escalations: {human_escalations}
+- Approvals Granted: {approvals_granted}
+- Approvals Denied: {approvals_denied}
+- Timeouts: {timeouts}
+- Errors: {errors}
+
+**Success Rate:** {success_rate:.1f}%
+
+**System Performance:**
+- Average Response Time: {avg_response_time_seconds:.1f} seconds
+- Uptime: {uptime_seconds} seconds
+
+Great work! The system is running smoothly.
+"""
+
+# Emoji prefixes keyed by message type, pre-joined with a trailing space
+_MESSAGE_PREFIX = {
+    "info": "ℹ️ ",
+    "success": "✅ ",
+    "warning": "⚠️ ",
+    "error": "❌ ",
+    "urgent": "🚨 "
+}
+_DEFAULT_PREFIX = "📧 "
+
+# Shared thread descriptor; the Chat API never mutates the payload, so a
+# single dict object is reused across every notification
+_THREAD = {"name": "email-automation-system"}
+
+# Payloads are pre-encoded with orjson rather than letting httpx run
+# stdlib json.dumps; the nested approval card is where this pays off
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Notifications only need second precision, so the formatted timestamp is
+# cached and reused until the clock ticks over
+_TS_FMT = '%Y-%m-%d %H:%M:%S'
+_ts_cache = (-1, '')
+
+
+def _timestamp() -> str:
+    """Current local time as 'YYYY-MM-DD HH:MM:SS', cached per second"""
+    global _ts_cache
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache = (now, time.strftime(_TS_FMT))
+    return _ts_cache[1]
+
+
+@lru_cache(maxsize=4)
+def _render_status(items: tuple) -> str:
+    """Render the status message, memoized on the status contents.
+
+    last_updated is baked in at render time, so it reflects when the
+    reported values last changed rather than when the message was resent.
+    """
+    status = dict(items)
+    return _STATUS_TMPL.format(
+        running='🟢 Running' if status.get('is_running') else '🔴 Stopped',
+        imap='🟢 Connected' if status.get('imap_connected') else '🔴 Disconnected',
+        smtp='🟢 Connected' if status.get('smtp_connected') else '🔴 Disconnected',
+        openai='🟢 Connected' if status.get('openai_connected') else '🔴 Disconnected',
+        emails_processed=status.get('total_emails_processed', 0),
+        responses_sent=status.get('total_responses_sent', 0),
+        uptime_seconds=status.get('uptime_seconds', 0),
+        error_count=status.get('error_count', 0),
+        last_updated=_timestamp()
+    )
+
+
+@lru_cache(maxsize=4)
+def _render_daily(date: str, items: tuple) -> str:
+    """Render the daily summary, memoized on the date and stats contents"""
+    stats = dict(items)
+    return _DAILY_SUMMARY_TMPL.format(
+        date=date,
+        emails_processed=stats.get('emails_processed', 0),
+        ai_responses=stats.get('ai_responses', 0),
+        human_escalations=stats.get('human_escalations', 0),
+        approvals_granted=stats.get('approvals_granted', 0),
+        approvals_denied=stats.get('approvals_denied', 0),
+        timeouts=stats.get('timeouts', 0),
+        errors=stats.get('errors', 0),
+        success_rate=stats.get('success_rate', 0),
+        avg_response_time_seconds=stats.get('avg_response_time_seconds', 0),
+        uptime_seconds=stats.get('uptime_seconds', 0)
+    )
+
+# Static shape of the interactive approval card; deep-copied and patched
+# with the message-specific fields per request
+_APPROVAL_CARD_SKELETON = {
+    "cards": [
+        {
+            "header": {
+                "title": "📧 Email Response Approval Required",
+                "subtitle": "",
+                "imageUrl": "https://via.placeholder.com/40x40/4285f4/ffffff?text=📧"
+            },
+            "sections": [
+                {
+                    "widgets": [
+                        {
+                            "textParagraph": {
+                                "text": ""
+                            }
+                        }
+                    ]
+                },
+                {
+                    "widgets": [
+                        {
+                            "buttons": [
+                                {
+                                    "textButton": {
+                                        "text": "✅ APPROVE",
+                                        "onClick": {
+                                            "action": {
+                                                "actionMethodName": "approve_response",
+                                                "parameters": [
+                                                    {
+                                                        "key": "message_id",
+                                                        "value": ""
+                                                    },
+                                                    {
+                                                        "key": "action",
+                                                        "value": "approve"
+                                                    }
+                                                ]
+                                            }
+                                        }
+                                    }
+                                },
+                                {
+                                    "textButton": {
+                                        "text": "❌ REJECT",
+                                        "onClick": {
+                                            "action": {
+                                                "actionMethodName": "approve_response",
+                                                "parameters": [
+                                                    {
+                                                        "key": "message_id",
+                                                        "value": ""
+                                                    },
+                                                    {
+                                                        "key": "action",
+                                                        "value": "reject"
+                                                    }
+                                                ]
+                                            }
+                                        }
+                                    }
+                                }
+                            ]
+                        }
+                    ]
+                },
+                {
+                    "widgets": [
+                        {
+                            "textParagraph": {
+                                "text": ""
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+    ],
+    "thread": {
+        "name": "email-approval-requests"
+    }
+}
+
+
 class GoogleChatHandler:
     """Handles Google Chat notifications and approval requests"""
-    
+
+    # Seconds within which a verbatim repeat of the last notification of a
+    # given type is dropped instead of POSTed again
+    DEDUP_TTL_SECONDS = 300
+
     def __init__(self, config: Config):
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.webhook_url = config.google_chat_webhook_url
         self.is_connected = False
-        self.session: Optional[aiohttp.ClientSession] = None
-    
+        # One persistent client for all webhook POSTs: keep-alive pooling
+        # plus HTTP/2 means back-to-back notifications reuse the same TLS
+        # session instead of paying a handshake per event
+        self.client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=8),
+            timeout=10.0
+        )
+        # Outbox queue: notifications are coalesced into a single card per
+        # flush so an error storm costs one POST instead of one per event
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._flush_task: Optional[asyncio.Task] = None
+        # Last (fingerprint, monotonic time) sent, keyed by message type
+        self._last_sent: Dict[str, tuple] = {}
+
     async def start(self):
         """Start the Google Chat handler"""
         try:
-            self.session = aiohttp.ClientSession()
-            await self.test_connection()
+            # The processor usually probed the webhook already; don't
+            # post a second test message in that case
+            if not self.is_connected:
+                await self.test_connection()
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._outbox_loop())
             self.logger.info("Google Chat handler started successfully")
         except Exception as e:
             self.logger.error(f"Failed to start Google Chat handler: {e}")
             raise
-    
+
     async def stop(self):
         """Stop the Google Chat handler"""
         try:
-            if self.session:
-                await self.session.close()
-                self.session = None
+            if self._flush_task:
+                self._flush_task.cancel()
+                try:
+                    await self._flush_task
+                except asyncio.CancelledError:
+                    pass
+                self._flush_task = None
+
+            # Flush anything still queued before closing the client
+            remaining = []
+            while True:
+                try:
+                    remaining.append(self._outbox.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            if remaining:
+                await self._post_batch(remaining)
+
+            await self.client.aclose()
             self.is_connected = False
             self.logger.info("Google Chat handler stopped")
         except Exception as e:
             self.logger.error(f"Error stopping Google Chat handler: {e}")
-    
+
     async def test_connection(self):
         """Test Google Chat webhook connection"""
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
-            
             # Send a test message
             test_message = {
                 "text": "🔧 Email Automation System - Connection Test Successful"
             }
-            
-            async with self.session.post(self.webhook_url, json=test_message) as response:
-                if response.status == 200:
-                    self.is_connected = True
-                    self.logger.info("Google Chat connection test successful")
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"HTTP {response.status}: {error_text}")
-                    
+
+            response = await self.client.post(
+                self.webhook_url,
+                content=orjson.dumps(test_message),
+                headers=_JSON_HEADERS
+            )
+            if response.status_code == 200:
+                self.is_connected = True
+                self.logger.info("Google Chat connection test successful")
+            else:
+                raise Exception(f"HTTP {response.status_code}: {response.text}")
+
         except Exception as e:
             self.logger.error(f"Google Chat connection test failed: {e}")
             self.is_connected = False
             raise
-    
+
     async def send_notification(self, message: str, message_type: str = "info"):
-        """Send a notification to Google Chat"""
+        """Queue a notification for Google Chat
+
+        Messages are coalesced by the outbox loop, so nearby notifications
+        share a single webhook POST. A message identical to the previous
+        one of its type is dropped inside the dedup TTL — status and
+        summary reports often repeat verbatim when stats haven't moved.
+        Urgent messages always go out.
+        """
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
-            
-            # Format message based on type
-            formatted_message = self._format_message(message, message_type)
-            
-            async with self.session.post(self.webhook_url, json=formatted_message) as response:
-                if response.status == 200:
-                    self.logger.info("Notification sent to Google Chat successfully")
+            if message_type != "urgent":
+                fingerprint = hash(message)
+                now = time.monotonic()
+                previous = self._last_sent.get(message_type)
+                if previous and previous[0] == fingerprint and now - previous[1] < self.DEDUP_TTL_SECONDS:
                     return True
-                else:
-                    error_text = await response.text()
-                    self.logger.error(f"Failed to send notification: HTTP {response.status}: {error_text}")
-                    return False
-                    
+                self._last_sent[message_type] = (fingerprint, now)
+
+            await self._outbox.put((message, message_type))
+            return True
+
         except Exception as e:
-            self.logger.error(f"Error sending notification to Google Chat: {e}")
+            self.logger.error(f"Error queueing notification for Google Chat: {e}")
             return False
-    
+
     async def send_approval_request(self, message: str, approval_data: Dict[str, Any] = None):
-        """Send an approval request to Google Chat with interactive buttons"""
+        """Send an approval request to Google Chat with interactive buttons
+
+        Approval requests bypass the outbox queue — the processor needs to
+        know synchronously whether the request reached Chat.
+        """
         try:
-            if not self.session:
-                self.session = aiohttp.ClientSession()
-            
             # Create interactive card with approval buttons
             card_message = self._create_approval_card(message, approval_data)
-            
-            async with self.session.post(self.webhook_url, json=card_message) as response:
-                if response.status == 200:
-                    self.logger.info("Approval request sent to Google Chat successfully")
-                    return True
-                else:
-                    error_text = await response.text()
-                    self.logger.error(f"Failed to send approval request: HTTP {response.status}: {error_text}")
-                    return False
-                    
+
+            if await self._post(card_message):
+                self.logger.info("Approval request sent to Google Chat successfully")
+                return True
+            return False
+
         except Exception as e:
             self.logger.error(f"Error sending approval request to Google Chat: {e}")
             return False
+
+    async def _post(self, payload: Dict[str, Any]) -> bool:
+        """POST a payload to the webhook, logging non-200 responses"""
+        response = await self.client.post(
+            self.webhook_url,
+            content=orjson.dumps(payload),
+            headers=_JSON_HEADERS
+        )
+        if response.status_code == 200:
+            return True
+        self.logger.error(f"Webhook POST failed: HTTP {response.status_code}: {response.text}")
+        return False
+
+    async def _outbox_loop(self):
+        """Drain the outbox, coalescing queued notifications into one POST"""
+        while True:
+            batch = [await self._outbox.get()]
+            try:
+                # Wait briefly for a second message, then sweep whatever
+                # else is already queued (up to 16 per flush)
+                batch.append(await asyncio.wait_for(self._outbox.get(), timeout=0.05))
+                while len(batch) < 16:
+                    batch.append(self._outbox.get_nowait())
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                pass
+
+            try:
+                await self._post_batch(batch)
+            except Exception as e:
+                self.logger.error(f"Error sending notification batch to Google Chat: {e}")
+
+    async def _post_batch(self, batch) -> bool:
+        """Send a batch of (message, message_type) pairs as one payload"""
+        if len(batch) == 1:
+            payload = self._format_message(*batch[0])
+        else:
+            sections = [
+                {"widgets": [{"textParagraph": {
+                    "text": _MESSAGE_PREFIX.get(message_type, _DEFAULT_PREFIX) + message
+                }}]}
+                for message, message_type in batch
+            ]
+            payload = {
+                "cards": [{
+                    "header": {"title": "📧 Email Automation Notifications"},
+                    "sections": sections
+                }],
+                "thread": _THREAD
+            }
+
+        if await self._post(payload):
+            self.logger.info(f"Sent {len(batch)} notification(s) to Google Chat")
+            return True
+        return False
     
+    @staticmethod
+    def _preview(body: str, limit: int) -> str:
+        """Truncate an email body for notification previews.
+
+        When the body exceeds the budget, quoted reply lines are dropped
+        first so the preview is spent on new content; short bodies pass
+        through without any allocation.
+        """
+        if len(body) <= limit:
+            return body
+        if body.startswith('>') or '\n>' in body:
+            body = '\n'.join(
+                line for line in body.splitlines() if not line.startswith('>')
+            )
+            if len(body) <= limit:
+                return body
+        return body[:limit] + '...'
+
     def _format_message(self, message: str, message_type: str) -> Dict[str, Any]:
         """Format message for Google Chat"""
-        # Choose emoji based on message type
-        emoji_map = {
-            "info": "ℹ️",
-            "success": "✅",
-            "warning": "⚠️",
-            "error": "❌",
-            "urgent": "🚨"
-        }
-        
-        emoji = emoji_map.get(message_type, "📧")
-        
+        prefix = _MESSAGE_PREFIX.get(message_type, _DEFAULT_PREFIX)
+
         return {
-            "text": f"{emoji} {message}",
-            "thread": {
-                "name": "email-automation-system"
-            }
+            "text": prefix + message,
+            "thread": _THREAD
         }
     
     def _create_approval_card(self, message: str, approval_data: Dict[str, Any] = None) -> Dict[str, Any]:
         """Create an interactive approval card for Google Chat"""
         message_id = approval_data.get('message_id', 'unknown') if approval_data else 'unknown'
-        
-        return {
-            "cards": [
-                {
-                    "header": {
-                        "title": "📧 Email Response Approval Required",
-                        "subtitle": f"Message ID: {message_id}",
-                        "imageUrl": "https://via.placeholder.com/40x40/4285f4/ffffff?text=📧"
-                    },
-                    "sections": [
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": message
-                                    }
-                                }
-                            ]
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "buttons": [
-                                        {
-                                            "textButton": {
-                                                "text": "✅ APPROVE",
-                                                "onClick": {
-                                                    "action": {
-                                                        "actionMethodName": "approve_response",
-                                                        "parameters": [
-                                                            {
-                                                                "key": "message_id",
-                                                                "value": message_id
-                                                            },
-                                                            {
-                                                                "key": "action",
-                                                                "value": "approve"
-                                                            }
-                                                        ]
-                                                    }
-                                                }
-                                            }
-                                        },
-                                        {
-                                            "textButton": {
-                                                "text": "❌ REJECT",
-                                                "onClick": {
-                                                    "action": {
-                                                        "actionMethodName": "approve_response",
-                                                        "parameters": [
-                                                            {
-                                                                "key": "message_id",
-                                                                "value": message_id
-                                                            },
-                                                            {
-                                                                "key": "action",
-                                                                "value": "reject"
-                                                            }
-                                                        ]
-                                                    }
-                                                }
-                                            }
-                                        }
-                                    ]
-                                }
-                            ]
-                        },
-                        {
-                            "widgets": [
-                                {
-                                    "textParagraph": {
-                                        "text": f"⏰ <b>Timeout:</b> {self.config.urgent_timeout_minutes} minutes"
-                                    }
-                                }
-                            ]
-                        }
-                    ]
-                }
-            ],
-            "thread": {
-                "name": "email-approval-requests"
-            }
-        }
+
+        card = copy.deepcopy(_APPROVAL_CARD_SKELETON)
+        inner = card["cards"][0]
+        inner["header"]["subtitle"] = f"Message ID: {message_id}"
+        sections = inner["sections"]
+        sections[0]["widgets"][0]["textParagraph"]["text"] = message
+        for button in sections[1]["widgets"][0]["buttons"]:
+            button["textButton"]["onClick"]["action"]["parameters"][0]["value"] = message_id
+        sections[2]["widgets"][0]["textParagraph"]["text"] = (
+            f"⏰ <b>Timeout:</b> {self.config.urgent_timeout_minutes} minutes"
+        )
+        return card
     
     async def send_urgent_notification(self, email_msg: EmailMessage):
         """Send urgent email notification"""
         try:
-            notification = f"""
-🚨 URGENT EMAIL REQUIRES IMMEDIATE ATTENTION 🚨
-
-**From:** {email_msg.sender}
-**Subject:** {email_msg.subject}
-**Received:** {email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S')}
-**Urgency Level:** {email_msg.urgency.value}/5
+            notification = _URGENT_TMPL.format(
+                sender=email_msg.sender,
+                subject=email_msg.subject,
+                received_at=email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S'),
+                urgency=email_msg.urgency.value,
+                body_preview=self._preview(email_msg.body, 200),
+                message_id=email_msg.message_id,
+                timeout_minutes=self.config.urgent_timeout_minutes
+            )
 
-**Message Preview:**
-{email_msg.body[:200]}{'...' if len(email_msg.body) > 200 else ''}
-
-**Message ID:** {email_msg.message_id}
-
-Please respond within {self.config.urgent_timeout_minutes} minutes or an automated fallback response will be sent.
-"""
-            
             return await self.send_notification(notification, "urgent")
             
         except Exception as e:
@@ -247,25 +516,17 @@ Please respond within {self.config.urgent_timeout_minutes} minutes or an automat
     async def send_approval_notification(self, email_msg: EmailMessage, ai_response: AIResponse):
         """Send approval request notification"""
         try:
-            approval_message = f"""
-📧 EMAIL RESPONSE REQUIRES APPROVAL
+            approval_message = _APPROVAL_TMPL.format(
+                sender=email_msg.sender,
+                subject=email_msg.subject,
+                received_at=email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S'),
+                body_preview=self._preview(email_msg.body, 300),
+                response_text=ai_response.response_text,
+                confidence_score=ai_response.confidence_score,
+                reasoning=ai_response.reasoning,
+                message_id=email_msg.message_id
+            )
 
-**From:** {email_msg.sender}
-**Subject:** {email_msg.subject}
-**Received:** {email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S')}
-
-**Original Message:**
-{email_msg.body[:300]}{'...' if len(email_msg.body) > 300 else ''}
-
-**Proposed AI Response:**
-{ai_response.response_text}
-
-**Confidence Score:** {ai_response.confidence_score:.2f}
-**Reasoning:** {ai_response.reasoning}
-
-**Message ID:** {email_msg.message_id}
-"""
-            
             approval_data = {
                 'message_id': email_msg.message_id,
                 'email': email_msg.dict(),
@@ -281,23 +542,8 @@ Please respond within {self.config.urgent_timeout_minutes} minutes or an automat
     async def send_system_status(self, status: Dict[str, Any]):
         """Send system status update"""
         try:
-            status_message = f"""
-📊 EMAIL AUTOMATION SYSTEM STATUS
-
-**System Status:** {'🟢 Running' if status.get('is_running') else '🔴 Stopped'}
-**IMAP:** {'🟢 Connected' if status.get('imap_connected') else '🔴 Disconnected'}
-**SMTP:** {'🟢 Connected' if status.get('smtp_connected') else '🔴 Disconnected'}
-**OpenAI:** {'🟢 Connected' if status.get('openai_connected') else '🔴 Disconnected'}
-
-**Statistics:**
-- Emails Processed: {status.get('total_emails_processed', 0)}
-- Responses Sent: {status.get('total_responses_sent', 0)}
-- Uptime: {status.get('uptime_seconds', 0)} seconds
-- Errors: {status.get('error_count', 0)}
+            status_message = _render_status(tuple(sorted(status.items())))
 
-**Last Updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-"""
-            
             return await self.send_notification(status_message, "info")
             
         except Exception as e:
@@ -307,18 +553,12 @@ Please respond within {self.config.urgent_timeout_minutes} minutes or an automat
     async def send_error_alert(self, error_message: str, error_details: str = ""):
         """Send error alert notification"""
         try:
-            alert_message = f"""
-🚨 SYSTEM ERROR ALERT
-
-**Error:** {error_message}
-
-**Details:** {error_details}
-
-**Time:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+            alert_message = _ERROR_ALERT_TMPL.format(
+                error_message=error_message,
+                error_details=error_details,
+                time=_timestamp()
+            )
 
-Please check the system logs for more information.
-"""
-            
             return await self.send_notification(alert_message, "error")
             
         except Exception as e:
@@ -328,46 +568,30 @@ Please check the system logs for more information.
     async def send_daily_summary(self, stats: Dict[str, Any]):
         """Send daily summary report"""
         try:
-            summary_message = f"""
-📈 DAILY EMAIL AUTOMATION SUMMARY
+            summary_message = _render_daily(_timestamp()[:10], tuple(sorted(stats.items())))
 
-**Date:** {datetime.now().strftime('%Y-%m-%d')}
-
-**Processing Statistics:**
-- Emails Processed: {stats.get('emails_processed', 0)}
-- AI Responses: {stats.get('ai_responses', 0)}
-- Human Escalations: {stats.get('human_escalations', 0)}
-- Approvals Granted: {stats.get('approvals_granted', 0)}
-- Approvals Denied: {stats.get('approvals_denied', 0)}
-- Timeouts: {stats.get('timeouts', 0)}
-- Errors: {stats.get('errors', 0)}
-
-**Success Rate:** {stats.get('success_rate', 0):.1f}%
-
-**System Performance:**
-- Average Response Time: {stats.get('avg_response_time_seconds', 0):.1f} seconds
-- Uptime: {stats.get('uptime_seconds', 0)} seconds
-
-Great work! The system is running smoothly.
-"""
-            
             return await self.send_notification(summary_message, "success")
             
         except Exception as e:
             self.logger.error(f"Error sending daily summary: {e}")
             return False
     
-    async def is_connected(self) -> bool:
-        """Check if Google Chat webhook is accessible"""
+    async def check_connection(self) -> bool:
+        """Check if Google Chat webhook is accessible with a test POST.
+
+        Named check_connection so it doesn't shadow the is_connected bool
+        attribute that tracks connection state.
+        """
         try:
-            if not self.session:
-                return False
-            
             # Simple test request
             test_message = {"text": "Connection test"}
-            async with self.session.post(self.webhook_url, json=test_message) as response:
-                return response.status == 200
-                
+            response = await self.client.post(
+                self.webhook_url,
+                content=orjson.dumps(test_message),
+                headers=_JSON_HEADERS
+            )
+            return response.status_code == 200
+
         except Exception as e:
             self.logger.warning(f"Google Chat connection check failed: {e}")
             return False
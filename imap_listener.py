@@ -3,27 +3,85 @@ IMAP Email Listener - Monitors incoming emails
 """
 
 import asyncio
+import base64
 import logging
 import email
+import email.utils
+import quopri
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import List, Optional
 import imaplib
 import ssl
 
 from config import Config
-from models import EmailMessage, create_email_from_raw
+from models import EmailMessage, create_email_from_raw, parse_headers
+
+
+# UID in a UID FETCH response envelope, e.g. b'1 (UID 457 BODY[] {1024}'
+_UID_RE = re.compile(rb'UID (\d+)')
+
+# A LIST response line, e.g. b'(\\HasNoChildren) "/" "INBOX/Sent"'
+_LIST_RE = re.compile(rb'\((?P<flags>.*?)\) "(?P<delim>.)" (?P<name>.+)')
+
+
+def _batched(seq, size):
+    """Yield successive size-length chunks of a sequence"""
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
 
 
 class IMAPListener:
     """IMAP email listener for monitoring incoming emails"""
-    
+
+    # Messages fetched per FETCH round trip; throughput plateaus around
+    # this size on common servers
+    FETCH_BATCH_SIZE = 100
+
+    # Re-issue IDLE before servers drop an idle connection (29 minutes;
+    # Gmail cuts sessions well before the RFC 2177 30-minute ceiling)
+    IDLE_RENEW_SECONDS = 1740
+
+    # While idling, wake this often to check whether another command is
+    # waiting for the session; bounds how long _run() can be held up
+    IDLE_POLL_SLICE_SECONDS = 5
+
+    # Probe a session with NOOP when it has been idle longer than this
+    KEEPALIVE_IDLE_SECONDS = 300
+
+    # Dedup entries retained; the oldest are evicted beyond this so the
+    # listener's memory stays bounded over months of uptime
+    PROCESSED_IDS_MAX = 50_000
+
     def __init__(self, config: Config):
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.imap_client: Optional[imaplib.IMAP4_SSL] = None
         self.is_connected = False
         self.last_check_time: Optional[datetime] = None
-        self.processed_message_ids: set = set()
+        # LRU of already-processed message ids (values unused); an
+        # unbounded set here is a slow leak on a long-running listener
+        self.processed_message_ids: OrderedDict = OrderedDict()
+        # One long-lived session reused across calls; the lock serializes
+        # connection recovery, the timestamp drives the NOOP keepalive and
+        # the cached mailbox name skips redundant SELECTs
+        self._conn_lock = asyncio.Lock()
+        # Serializes threaded client commands: imaplib is not thread-safe
+        self._io_lock = asyncio.Lock()
+        # Set by _run() to ask an in-flight IDLE to wind down early
+        self._idle_interrupt = threading.Event()
+        self._last_activity = 0.0
+        self._selected_mailbox: Optional[str] = None
+        # Highest UID already fetched; lets each poll search only newer
+        # messages instead of flag-scanning the whole mailbox
+        self._last_seen_uid = 0
+        # LRU of message_id -> UID bytes so flag/move operations skip the
+        # O(mailbox) server-side header search
+        self._uid_by_message_id: OrderedDict = OrderedDict()
     
     async def start(self):
         """Start the IMAP listener"""
@@ -38,41 +96,50 @@ class IMAPListener:
         """Stop the IMAP listener"""
         try:
             if self.imap_client:
-                self.imap_client.close()
-                self.imap_client.logout()
+                await self._run(self.imap_client.close)
+                await self._run(self.imap_client.logout)
                 self.imap_client = None
             self.is_connected = False
+            self._selected_mailbox = None
             self.logger.info("IMAP listener stopped")
         except Exception as e:
             self.logger.error(f"Error stopping IMAP listener: {e}")
     
+    def _connect_sync(self):
+        """Blocking connect + login + SELECT, run in a worker thread"""
+        # Create SSL context
+        context = ssl.create_default_context()
+
+        # Connect to IMAP server
+        if self.config.imap_use_ssl:
+            self.imap_client = imaplib.IMAP4_SSL(
+                self.config.imap_host,
+                self.config.imap_port,
+                ssl_context=context
+            )
+        else:
+            self.imap_client = imaplib.IMAP4(self.config.imap_host, self.config.imap_port)
+
+        # Login
+        self.imap_client.login(self.config.imap_email, self.config.imap_password)
+
+        # Select inbox
+        self.imap_client.select('INBOX')
+
     async def _connect(self):
         """Establish IMAP connection"""
         try:
             self.logger.info(f"Connecting to IMAP server: {self.config.imap_host}:{self.config.imap_port}")
-            
-            # Create SSL context
-            context = ssl.create_default_context()
-            
-            # Connect to IMAP server
-            if self.config.imap_use_ssl:
-                self.imap_client = imaplib.IMAP4_SSL(
-                    self.config.imap_host, 
-                    self.config.imap_port, 
-                    ssl_context=context
-                )
-            else:
-                self.imap_client = imaplib.IMAP4(self.config.imap_host, self.config.imap_port)
-            
-            # Login
-            self.imap_client.login(self.config.imap_email, self.config.imap_password)
-            
-            # Select inbox
-            self.imap_client.select('INBOX')
-            
+
+            async with self._io_lock:
+                await asyncio.to_thread(self._connect_sync)
+
+            self._selected_mailbox = 'INBOX'
+            self._last_activity = time.monotonic()
+
             self.is_connected = True
             self.logger.info("IMAP connection established successfully")
-            
+
         except Exception as e:
             self.logger.error(f"Failed to connect to IMAP server: {e}")
             self.is_connected = False
@@ -81,67 +148,165 @@ class IMAPListener:
     async def test_connection(self):
         """Test IMAP connection"""
         try:
-            if not self.is_connected:
-                await self._connect()
-            
-            # Test by selecting inbox
-            self.imap_client.select('INBOX')
+            await self._ensure_connection()
+
+            # Probe with NOOP; SELECT would reset server-side state
+            await self._run(self.imap_client.noop)
+            self._last_activity = time.monotonic()
             self.logger.info("IMAP connection test successful")
             
         except Exception as e:
             self.logger.error(f"IMAP connection test failed: {e}")
             raise
     
-    async def get_new_emails(self) -> List[EmailMessage]:
-        """Get new emails since last check"""
-        try:
-            if not self.is_connected:
+    async def _ensure_connection(self):
+        """Reuse the persistent session, probing or reconnecting as needed.
+
+        Reconnects only when the session is missing or a keepalive probe
+        fails, so callers stop paying a TLS handshake plus LOGIN per call.
+        """
+        async with self._conn_lock:
+            if self.imap_client is None or not self.is_connected:
                 await self._connect()
-            
-            # Select inbox
-            self.imap_client.select('INBOX')
-            
-            # Search for unread emails
-            status, messages = self.imap_client.search(None, 'UNSEEN')
-            
+                return
+
+            if time.monotonic() - self._last_activity > self.KEEPALIVE_IDLE_SECONDS:
+                try:
+                    await self._run(self.imap_client.noop)
+                    self._last_activity = time.monotonic()
+                except (imaplib.IMAP4.abort, OSError):
+                    self.logger.info("Idle IMAP session dropped; reconnecting")
+                    self.is_connected = False
+                    self.imap_client = None
+                    await self._connect()
+
+    async def _run(self, fn, *args):
+        """Run a blocking imaplib call in a worker thread.
+
+        Keeps multi-second IMAP round trips off the event loop so other
+        coroutines make progress; the lock serializes commands because the
+        underlying connection is not thread-safe. If the session is parked
+        in IDLE, the interrupt flag makes it surface within one poll slice
+        so this call isn't stuck behind the full renew window.
+        """
+        self._idle_interrupt.set()
+        async with self._io_lock:
+            self._idle_interrupt.clear()
+            return await asyncio.to_thread(fn, *args)
+
+    async def _select(self, mailbox: str = 'INBOX'):
+        """SELECT a mailbox only when it isn't the one already selected"""
+        if self._selected_mailbox != mailbox:
+            await self._run(self.imap_client.select, mailbox)
+            self._selected_mailbox = mailbox
+            self._last_activity = time.monotonic()
+
+    async def get_new_emails(self, body_only: bool = False) -> List[EmailMessage]:
+        """Get new emails since last check.
+
+        With body_only=True, HTML parts are left undecoded — enough for
+        triage paths that only read the plain-text body.
+        """
+        try:
+            await self._ensure_connection()
+            await self._select('INBOX')
+
+            # Search for unread emails. After the first pass, only UIDs
+            # above the high-water mark are considered — O(new messages)
+            # on the server instead of a full-mailbox flag scan.
+            if self._last_seen_uid:
+                status, messages = await self._run(
+                    self.imap_client.uid, 'SEARCH', None,
+                    f'UID {self._last_seen_uid + 1}:*')
+            else:
+                status, messages = await self._run(
+                    self.imap_client.uid, 'SEARCH', None, 'UNSEEN')
+
             if status != 'OK':
                 self.logger.error("Failed to search for emails")
                 return []
-            
+
             email_ids = messages[0].split()
+            if self._last_seen_uid:
+                # 'n:*' always matches the highest existing UID even when it
+                # is <= n; drop anything at or below the mark
+                email_ids = [uid for uid in email_ids if int(uid) > self._last_seen_uid]
             new_emails = []
-            
-            for email_id in email_ids:
+
+            for chunk in _batched(email_ids, self.FETCH_BATCH_SIZE):
                 try:
-                    # Fetch email
-                    status, msg_data = self.imap_client.fetch(email_id, '(RFC822)')
-                    
+                    # One FETCH round trip per chunk instead of one per
+                    # message. BODY.PEEK[] keeps the server from implicitly
+                    # flagging messages seen, so \Seen stays under our control.
+                    status, msg_data = await self._run(
+                        self.imap_client.uid, 'FETCH', b",".join(chunk), '(BODY.PEEK[])')
+
                     if status != 'OK':
+                        self.logger.error("Failed to fetch email batch")
                         continue
-                    
-                    # Parse email
-                    raw_email = msg_data[0][1]
-                    email_msg = create_email_from_raw(raw_email, email_id.decode())
-                    
-                    # Check if we've already processed this email
-                    if email_msg.message_id in self.processed_message_ids:
-                        continue
-                    
-                    # Add to processed set
-                    self.processed_message_ids.add(email_msg.message_id)
-                    
-                    # Mark as read
-                    self.imap_client.store(email_id, '+FLAGS', '\\Seen')
-                    
-                    new_emails.append(email_msg)
-                    
-                    self.logger.info(f"Retrieved new email: {email_msg.message_id} from {email_msg.sender}")
-                    
+
+                    seen_ids = []
+                    for item in msg_data:
+                        # Fetch responses interleave (envelope, payload)
+                        # tuples with closing-paren tokens
+                        if not isinstance(item, tuple):
+                            continue
+
+                        uid_match = _UID_RE.search(item[0])
+                        if not uid_match:
+                            continue
+                        email_id = uid_match.group(1)
+                        raw_email = item[1]
+
+                        try:
+                            # Dedup on the UID before parsing: a repeat
+                            # costs one dict lookup instead of a full MIME
+                            # parse that gets thrown away
+                            message_id = email_id.decode()
+                            if message_id in self.processed_message_ids:
+                                self.processed_message_ids.move_to_end(message_id)
+                                continue
+
+                            # Parse email
+                            email_msg = create_email_from_raw(
+                                raw_email, message_id, parse_html=not body_only)
+
+                            # Remember it, evicting the oldest entry at cap
+                            self.processed_message_ids[email_msg.message_id] = None
+                            if len(self.processed_message_ids) > self.PROCESSED_IDS_MAX:
+                                self.processed_message_ids.popitem(last=False)
+
+                            self._uid_by_message_id[email_msg.message_id] = email_id
+                            if len(self._uid_by_message_id) > self.PROCESSED_IDS_MAX:
+                                self._uid_by_message_id.popitem(last=False)
+
+                            seen_ids.append(email_id)
+                            new_emails.append(email_msg)
+
+                            self.logger.info(f"Retrieved new email: {email_msg.message_id} from {email_msg.sender}")
+
+                        except Exception as e:
+                            self.logger.error(f"Error processing email {email_id}: {e}")
+                            continue
+
+                    # Mark the whole batch as read in one round trip;
+                    # .SILENT suppresses the per-message FETCH echo the
+                    # server would otherwise send back
+                    if seen_ids:
+                        await self._run(
+                            self.imap_client.uid, 'STORE',
+                            b",".join(seen_ids), '+FLAGS.SILENT', '\\Seen')
+
+                    # Advance the high-water mark past this batch
+                    self._last_seen_uid = max(
+                        self._last_seen_uid, max(int(uid) for uid in chunk))
+
                 except Exception as e:
-                    self.logger.error(f"Error processing email {email_id}: {e}")
+                    self.logger.error(f"Error fetching email batch: {e}")
                     continue
-            
+
             self.last_check_time = datetime.now()
+            self._last_activity = time.monotonic()
             self.logger.info(f"Retrieved {len(new_emails)} new emails")
             
             return new_emails
@@ -150,21 +315,284 @@ class IMAPListener:
             self.logger.error(f"Error getting new emails: {e}")
             self.is_connected = False
             return []
-    
+
+    async def get_new_emails_lite(self) -> List[EmailMessage]:
+        """Get new emails fetching only headers and the first text part.
+
+        Triage passes (urgency scoring, routing) rarely need attachments
+        or HTML alternatives, which dominate transfer size; fetching
+        BODY[HEADER] plus the first part's MIME headers and content keeps
+        those bytes on the server. Callers that end up needing the
+        complete message escalate with _fetch_full(uid). Messages carry
+        metadata['lite_fetch'] = True so downstream code can tell a
+        partial view from a full one.
+        """
+        try:
+            await self._ensure_connection()
+            await self._select('INBOX')
+
+            if self._last_seen_uid:
+                status, messages = await self._run(
+                    self.imap_client.uid, 'SEARCH', None,
+                    f'UID {self._last_seen_uid + 1}:*')
+            else:
+                status, messages = await self._run(
+                    self.imap_client.uid, 'SEARCH', None, 'UNSEEN')
+
+            if status != 'OK':
+                self.logger.error("Failed to search for emails")
+                return []
+
+            email_ids = messages[0].split()
+            if self._last_seen_uid:
+                email_ids = [uid for uid in email_ids if int(uid) > self._last_seen_uid]
+            new_emails = []
+
+            for chunk in _batched(email_ids, self.FETCH_BATCH_SIZE):
+                try:
+                    status, msg_data = await self._run(
+                        self.imap_client.uid, 'FETCH', b",".join(chunk),
+                        '(UID BODY.PEEK[HEADER] BODY.PEEK[1.MIME] BODY.PEEK[1])')
+
+                    if status != 'OK':
+                        self.logger.error("Failed to fetch email batch")
+                        continue
+
+                    # Each message yields three literals in request order:
+                    # the one whose envelope carries the UID starts a record
+                    # (headers), then the part's MIME headers, then the
+                    # text part itself
+                    records = []
+                    current = None
+                    for item in msg_data:
+                        if not isinstance(item, tuple):
+                            continue
+                        uid_match = _UID_RE.search(item[0])
+                        if uid_match:
+                            current = [uid_match.group(1), item[1]]
+                            records.append(current)
+                        elif current is not None:
+                            current.append(item[1])
+
+                    seen_ids = []
+                    for record in records:
+                        email_id, header_bytes = record[0], record[1]
+                        mime_bytes = record[2] if len(record) > 2 else b''
+                        text_bytes = record[3] if len(record) > 3 else b''
+                        try:
+                            message_id = email_id.decode()
+                            if message_id in self.processed_message_ids:
+                                self.processed_message_ids.move_to_end(message_id)
+                                continue
+
+                            email_msg = self._build_lite_message(
+                                message_id, header_bytes, mime_bytes, text_bytes)
+
+                            self.processed_message_ids[email_msg.message_id] = None
+                            if len(self.processed_message_ids) > self.PROCESSED_IDS_MAX:
+                                self.processed_message_ids.popitem(last=False)
+
+                            self._uid_by_message_id[email_msg.message_id] = email_id
+                            if len(self._uid_by_message_id) > self.PROCESSED_IDS_MAX:
+                                self._uid_by_message_id.popitem(last=False)
+
+                            seen_ids.append(email_id)
+                            new_emails.append(email_msg)
+
+                            self.logger.info(f"Retrieved new email (lite): {email_msg.message_id} from {email_msg.sender}")
+
+                        except Exception as e:
+                            self.logger.error(f"Error processing email {email_id}: {e}")
+                            continue
+
+                    if seen_ids:
+                        await self._run(
+                            self.imap_client.uid, 'STORE',
+                            b",".join(seen_ids), '+FLAGS.SILENT', '\\Seen')
+
+                    self._last_seen_uid = max(
+                        self._last_seen_uid, max(int(uid) for uid in chunk))
+
+                except Exception as e:
+                    self.logger.error(f"Error fetching email batch: {e}")
+                    continue
+
+            self.last_check_time = datetime.now()
+            self._last_activity = time.monotonic()
+            self.logger.info(f"Retrieved {len(new_emails)} new emails")
+
+            return new_emails
+
+        except Exception as e:
+            self.logger.error(f"Error getting new emails: {e}")
+            self.is_connected = False
+            return []
+
+    @staticmethod
+    def _decode_text_part(mime_bytes: bytes, text_bytes: bytes) -> str:
+        """Decode a raw BODY[1] literal per its MIME headers.
+
+        The bytes on the wire are still in the part's transfer encoding —
+        base64 or quoted-printable text decoded straight as UTF-8 comes
+        out as garbage — so undo that first, then decode with the
+        charset the part declares.
+        """
+        part = parse_headers(mime_bytes) if mime_bytes else None
+        cte = str(part.get('Content-Transfer-Encoding', '') if part else '').strip().lower()
+        if cte == 'base64':
+            try:
+                text_bytes = base64.b64decode(text_bytes)
+            except Exception:
+                pass
+        elif cte == 'quoted-printable':
+            text_bytes = quopri.decodestring(text_bytes)
+        # 7bit / 8bit / binary need no transfer decoding
+        charset = (part.get_content_charset() if part else None) or 'utf-8'
+        try:
+            return text_bytes.decode(charset, errors='ignore')
+        except LookupError:
+            return text_bytes.decode('utf-8', errors='ignore')
+
+    @classmethod
+    def _build_lite_message(cls, uid: str, header_bytes: bytes, mime_bytes: bytes,
+                            text_bytes: bytes) -> EmailMessage:
+        """Build a partial EmailMessage from separately fetched headers and text"""
+        headers = parse_headers(header_bytes)
+        sender = email.utils.parseaddr(headers.get('From', ''))[1]
+        recipient = email.utils.parseaddr(headers.get('To', ''))[1]
+        return EmailMessage(
+            message_id=uid,
+            subject=str(headers.get('Subject', 'No Subject')),
+            sender=sender or "unknown@unknown.com",
+            sender_domain=sender.rpartition('@')[2].lower(),
+            sender_local=sender.partition('@')[0],
+            recipient=recipient or "unknown@unknown.com",
+            body=cls._decode_text_part(mime_bytes, text_bytes),
+            metadata={
+                'raw_headers': {k: str(v) for k, v in headers.items()},
+                'date': str(headers.get('Date', '')) or None,
+                'lite_fetch': True
+            }
+        )
+
+    async def _fetch_full(self, uid) -> Optional[EmailMessage]:
+        """Fetch the complete message for a UID seen via get_new_emails_lite"""
+        try:
+            await self._ensure_connection()
+            await self._select('INBOX')
+            if isinstance(uid, str):
+                uid = uid.encode()
+            status, msg_data = await self._run(
+                self.imap_client.uid, 'FETCH', uid, '(BODY.PEEK[])')
+            if status != 'OK':
+                self.logger.error(f"Failed to fetch full email {uid}")
+                return None
+            for item in msg_data:
+                if isinstance(item, tuple):
+                    return create_email_from_raw(item[1], uid.decode())
+            return None
+        except Exception as e:
+            self.logger.error(f"Error fetching full email {uid}: {e}")
+            return None
+
+    def _supports_idle(self) -> bool:
+        """Whether the server advertises the IDLE capability"""
+        return self.imap_client is not None and 'IDLE' in self.imap_client.capabilities
+
+    def _idle_wait(self, timeout: float) -> bytes:
+        """Enter IDLE and block until the server pushes a response or timeout.
+
+        Runs in a worker thread with _io_lock held by the caller. Stdlib
+        imaplib has no IDLE support, so the command is driven over its
+        line-level send/readline primitives; the first untagged line the
+        server pushes (e.g. '* 5 EXISTS') is returned, or b'' on timeout.
+        The wait is sliced so the _idle_interrupt flag (set by _run when
+        another command needs the session) ends the window early.
+        """
+        client = self.imap_client
+        tag = client._new_tag()
+        client.send(tag + b' IDLE\r\n')
+        response = client.readline()
+        if not response.startswith(b'+'):
+            raise imaplib.IMAP4.error(f"Server refused IDLE: {response!r}")
+
+        deadline = time.monotonic() + timeout
+        line = b''
+        try:
+            while not self._idle_interrupt.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                client.sock.settimeout(min(self.IDLE_POLL_SLICE_SECONDS, remaining))
+                try:
+                    line = client.readline()
+                    break
+                except (socket.timeout, TimeoutError):
+                    continue
+        finally:
+            client.sock.settimeout(None)
+            client.send(b'DONE\r\n')
+            # Drain until the tagged completion of the IDLE command
+            while True:
+                done_line = client.readline()
+                if not done_line or done_line.startswith(tag):
+                    break
+        return line
+
+    async def idle_loop(self, on_message):
+        """Wait for server push and hand each new email to on_message.
+
+        Uses IMAP IDLE (RFC 2177) when the server supports it, re-issuing
+        the command every 29 minutes to survive server-side idle drops;
+        servers without IDLE fall back to the configured polling interval.
+        Reconnects with exponential backoff on errors.
+        """
+        backoff = 1
+        while True:
+            try:
+                if not self.is_connected:
+                    await self._connect()
+
+                # Sweep first so mail that arrived while not idling (or
+                # before startup) is picked up without waiting for a push.
+                # The lite fetch suffices here: the processing pipeline
+                # reads headers and the text body only, and anything that
+                # needs the complete message escalates via _fetch_full.
+                for email_msg in await self.get_new_emails_lite():
+                    await on_message(email_msg)
+
+                if self._supports_idle():
+                    # Hold _io_lock for the IDLE window: interleaving another
+                    # command's raw traffic mid-IDLE corrupts the session.
+                    # _run's interrupt flag keeps the hold bounded.
+                    async with self._io_lock:
+                        await asyncio.to_thread(self._idle_wait, self.IDLE_RENEW_SECONDS)
+                else:
+                    await asyncio.sleep(self.config.imap_check_interval)
+
+                backoff = 1
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"IDLE loop error: {e}; reconnecting in {backoff}s")
+                self.is_connected = False
+                self.imap_client = None
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 300)
+
     async def get_emails_since(self, since_time: datetime) -> List[EmailMessage]:
         """Get emails since a specific time"""
         try:
-            if not self.is_connected:
-                await self._connect()
-            
-            # Select inbox
-            self.imap_client.select('INBOX')
-            
+            await self._ensure_connection()
+            await self._select('INBOX')
+
             # Format date for IMAP search
             date_str = since_time.strftime('%d-%b-%Y')
             
             # Search for emails since date
-            status, messages = self.imap_client.search(None, f'SINCE {date_str}')
+            status, messages = await self._run(
+                self.imap_client.uid, 'SEARCH', None, f'SINCE {date_str}')
             
             if status != 'OK':
                 self.logger.error("Failed to search for emails since date")
@@ -172,25 +600,40 @@ class IMAPListener:
             
             email_ids = messages[0].split()
             emails = []
-            
-            for email_id in email_ids:
+
+            for chunk in _batched(email_ids, self.FETCH_BATCH_SIZE):
                 try:
-                    # Fetch email
-                    status, msg_data = self.imap_client.fetch(email_id, '(RFC822)')
-                    
+                    status, msg_data = await self._run(
+                        self.imap_client.uid, 'FETCH', b",".join(chunk), '(BODY.PEEK[])')
+
                     if status != 'OK':
+                        self.logger.error("Failed to fetch email batch")
                         continue
-                    
-                    # Parse email
-                    raw_email = msg_data[0][1]
-                    email_msg = create_email_from_raw(raw_email, email_id.decode())
-                    
-                    # Check if email is newer than since_time
-                    if email_msg.received_at > since_time:
-                        emails.append(email_msg)
-                    
+
+                    for item in msg_data:
+                        if not isinstance(item, tuple):
+                            continue
+
+                        uid_match = _UID_RE.search(item[0])
+                        if not uid_match:
+                            continue
+                        email_id = uid_match.group(1)
+                        raw_email = item[1]
+
+                        try:
+                            # Parse email
+                            email_msg = create_email_from_raw(raw_email, email_id.decode())
+
+                            # Check if email is newer than since_time
+                            if email_msg.received_at > since_time:
+                                emails.append(email_msg)
+
+                        except Exception as e:
+                            self.logger.error(f"Error processing email {email_id}: {e}")
+                            continue
+
                 except Exception as e:
-                    self.logger.error(f"Error processing email {email_id}: {e}")
+                    self.logger.error(f"Error fetching email batch: {e}")
                     continue
             
             self.logger.info(f"Retrieved {len(emails)} emails since {since_time}")
@@ -203,21 +646,30 @@ class IMAPListener:
     async def mark_as_read(self, message_id: str):
         """Mark an email as read"""
         try:
-            if not self.is_connected:
-                await self._connect()
-            
-            # Search for the specific message
-            status, messages = self.imap_client.search(None, f'HEADER Message-ID "{message_id}"')
+            await self._ensure_connection()
+            await self._select('INBOX')
+
+            # Cached UID: one STORE, no mailbox scan
+            uid = self._uid_by_message_id.get(message_id)
+            if uid is not None:
+                await self._run(
+                    self.imap_client.uid, 'STORE', uid, '+FLAGS.SILENT', '\\Seen')
+                self.logger.info(f"Marked email as read: {message_id}")
+                return True
+
+            # Cache miss: fall back to a server-side header search
+            status, messages = await self._run(
+                self.imap_client.search, None, f'HEADER Message-ID "{message_id}"')
             
             if status != 'OK' or not messages[0]:
                 self.logger.warning(f"Could not find message with ID: {message_id}")
                 return False
             
             email_ids = messages[0].split()
-            
-            for email_id in email_ids:
-                # Mark as read
-                self.imap_client.store(email_id, '+FLAGS', '\\Seen')
+
+            # One STORE for however many messages matched
+            await self._run(
+                self.imap_client.store, b",".join(email_ids), '+FLAGS.SILENT', '\\Seen')
             
             self.logger.info(f"Marked email as read: {message_id}")
             return True
@@ -225,36 +677,88 @@ class IMAPListener:
         except Exception as e:
             self.logger.error(f"Error marking email as read {message_id}: {e}")
             return False
-    
+
+    async def mark_many_as_read(self, message_ids: List[str]) -> bool:
+        """Mark a batch of emails as read with a single STORE.
+
+        Repeated mark_as_read calls cost a round trip each; ids resolved
+        through the UID cache collapse into one STORE, and only cache
+        misses pay for a header search.
+        """
+        try:
+            if not message_ids:
+                return True
+
+            await self._ensure_connection()
+            await self._select('INBOX')
+
+            uids = []
+            unresolved = []
+            for message_id in message_ids:
+                uid = self._uid_by_message_id.get(message_id)
+                if uid is not None:
+                    uids.append(uid)
+                else:
+                    unresolved.append(message_id)
+
+            if uids:
+                await self._run(
+                    self.imap_client.uid, 'STORE',
+                    b",".join(uids), '+FLAGS.SILENT', '\\Seen')
+
+            # Cache misses: one header search each, then one joined STORE
+            email_ids = []
+            for message_id in unresolved:
+                status, messages = await self._run(
+                    self.imap_client.search, None, f'HEADER Message-ID "{message_id}"')
+                if status != 'OK' or not messages[0]:
+                    self.logger.warning(f"Could not find message with ID: {message_id}")
+                    continue
+                email_ids.extend(messages[0].split())
+
+            if email_ids:
+                await self._run(
+                    self.imap_client.store, b",".join(email_ids), '+FLAGS.SILENT', '\\Seen')
+
+            marked = len(uids) + len(email_ids)
+            self.logger.info(f"Marked {marked} emails as read")
+            return marked > 0
+
+        except Exception as e:
+            self.logger.error(f"Error marking emails as read: {e}")
+            return False
+
     async def move_to_folder(self, message_id: str, folder_name: str):
         """Move an email to a specific folder"""
         try:
-            if not self.is_connected:
-                await self._connect()
-            
+            await self._ensure_connection()
+            await self._select('INBOX')
+
             # Create folder if it doesn't exist
             try:
-                self.imap_client.create(folder_name)
+                await self._run(self.imap_client.create, folder_name)
             except imaplib.IMAP4.error:
                 pass  # Folder already exists
             
-            # Search for the specific message
-            status, messages = self.imap_client.search(None, f'HEADER Message-ID "{message_id}"')
+            # Cached UID: move directly, no mailbox scan
+            uid = self._uid_by_message_id.get(message_id)
+            if uid is not None:
+                await self._move_ids(uid, folder_name, by_uid=True)
+                self._uid_by_message_id.pop(message_id, None)
+                self.logger.info(f"Moved email to {folder_name}: {message_id}")
+                return True
+
+            # Cache miss: fall back to a server-side header search
+            status, messages = await self._run(
+                self.imap_client.search, None, f'HEADER Message-ID "{message_id}"')
             
             if status != 'OK' or not messages[0]:
                 self.logger.warning(f"Could not find message with ID: {message_id}")
                 return False
             
             email_ids = messages[0].split()
-            
-            for email_id in email_ids:
-                # Copy to folder
-                self.imap_client.copy(email_id, folder_name)
-                # Delete from inbox
-                self.imap_client.store(email_id, '+FLAGS', '\\Deleted')
-            
-            # Expunge deleted messages
-            self.imap_client.expunge()
+
+            await self._move_ids(b",".join(email_ids), folder_name)
             
             self.logger.info(f"Moved email to {folder_name}: {message_id}")
             return True
@@ -263,13 +767,64 @@ class IMAPListener:
             self.logger.error(f"Error moving email to folder {message_id}: {e}")
             return False
     
+    async def _move_ids(self, id_set: bytes, folder_name: str, by_uid: bool = False):
+        """COPY + mark deleted + EXPUNGE an id set in three round trips"""
+        if by_uid:
+            await self._run(self.imap_client.uid, 'COPY', id_set, folder_name)
+            await self._run(
+                self.imap_client.uid, 'STORE', id_set, '+FLAGS.SILENT', '\\Deleted')
+        else:
+            await self._run(self.imap_client.copy, id_set, folder_name)
+            await self._run(
+                self.imap_client.store, id_set, '+FLAGS.SILENT', '\\Deleted')
+        await self._run(self.imap_client.expunge)
+
+    async def move_many(self, message_ids: List[str], folder_name: str) -> bool:
+        """Move a batch of emails to a folder with one COPY/STORE/EXPUNGE.
+
+        Callers moving several messages should prefer this over repeated
+        move_to_folder calls, which each pay their own EXPUNGE round trip.
+        """
+        try:
+            if not message_ids:
+                return True
+
+            await self._ensure_connection()
+            await self._select('INBOX')
+
+            # Create folder if it doesn't exist
+            try:
+                await self._run(self.imap_client.create, folder_name)
+            except imaplib.IMAP4.error:
+                pass  # Folder already exists
+
+            email_ids = []
+            for message_id in message_ids:
+                status, messages = await self._run(
+                    self.imap_client.search, None, f'HEADER Message-ID "{message_id}"')
+                if status != 'OK' or not messages[0]:
+                    self.logger.warning(f"Could not find message with ID: {message_id}")
+                    continue
+                email_ids.extend(messages[0].split())
+
+            if not email_ids:
+                return False
+
+            await self._move_ids(b",".join(email_ids), folder_name)
+
+            self.logger.info(f"Moved {len(email_ids)} emails to {folder_name}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Error moving emails to folder {folder_name}: {e}")
+            return False
+
     async def get_folder_list(self) -> List[str]:
         """Get list of available folders"""
         try:
-            if not self.is_connected:
-                await self._connect()
-            
-            status, folders = self.imap_client.list()
+            await self._ensure_connection()
+
+            status, folders = await self._run(self.imap_client.list)
             
             if status != 'OK':
                 self.logger.error("Failed to get folder list")
@@ -277,28 +832,33 @@ class IMAPListener:
             
             folder_names = []
             for folder in folders:
-                # Parse folder name from IMAP response
-                folder_str = folder.decode()
-                if '"/"' in folder_str:
-                    folder_name = folder_str.split('"/"')[1].strip('"')
-                    folder_names.append(folder_name)
-            
+                # Parse folder name from IMAP response; the regex handles
+                # any hierarchy delimiter, not just '/'
+                match = _LIST_RE.match(folder)
+                if match:
+                    folder_names.append(match.group('name').decode().strip('"'))
+
             return folder_names
             
         except Exception as e:
             self.logger.error(f"Error getting folder list: {e}")
             return []
     
-    async def is_connected(self) -> bool:
-        """Check if IMAP connection is active"""
+    async def check_connection(self) -> bool:
+        """Check if IMAP connection is active.
+
+        Probes with NOOP: unlike SELECT it carries no mailbox state, so
+        the check doesn't reset the selected-mailbox cache or trigger a
+        full mailbox status response.
+        """
         try:
             if not self.imap_client:
                 return False
-            
-            # Test connection by selecting inbox
-            self.imap_client.select('INBOX')
+
+            await self._run(self.imap_client.noop)
+            self._last_activity = time.monotonic()
             return True
-            
+
         except Exception as e:
             self.logger.warning(f"IMAP connection check failed: {e}")
             self.is_connected = False
@@ -308,7 +868,6 @@ class IMAPListener:
         """Reconnect to IMAP server"""
         try:
             await self.stop()
-            await asyncio.sleep(1)  # Brief pause before reconnecting
             await self._connect()
             self.logger.info("IMAP reconnected successfully")
         except Exception as e:
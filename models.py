@@ -5,9 +5,33 @@ Data models for Email Automation System
 from datetime import datetime
 from enum import Enum
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 import email
-import json
+import email.parser
+import email.policy
+import email.utils
+import re
+
+# Compiled once; the validator runs twice per constructed EmailMessage
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# policy.default (vs the legacy compat32 one message_from_bytes uses)
+# decodes RFC 2047 encoded-word headers into proper str on access
+_PARSER = email.parser.BytesParser(policy=email.policy.default)
+
+
+def parse_headers(raw_email: bytes) -> email.message.Message:
+    """Parse only the header block of a raw message.
+
+    Skips body materialization entirely — use this for prefilter passes
+    (sender checks, dedup, Date) and call parse_full only on survivors.
+    """
+    return _PARSER.parsebytes(raw_email, headersonly=True)
+
+
+def parse_full(raw_email: bytes) -> email.message.Message:
+    """Fully parse a raw message, body and attachments included"""
+    return _PARSER.parsebytes(raw_email)
 
 
 class UrgencyLevel(int, Enum):
@@ -33,6 +57,8 @@ class EmailMessage(BaseModel):
     message_id: str = Field(..., description="Unique message ID")
     subject: str = Field(..., description="Email subject")
     sender: str = Field(..., description="Sender email address")
+    sender_domain: str = Field("", description="Lowercased sender domain, set at parse time")
+    sender_local: str = Field("", description="Sender address local part, set at parse time")
     recipient: str = Field(..., description="Recipient email address")
     body: str = Field(..., description="Email body content")
     html_body: Optional[str] = Field(None, description="HTML email body")
@@ -43,16 +69,21 @@ class EmailMessage(BaseModel):
     response_sent_at: Optional[datetime] = Field(None, description="When response was sent")
     attachments: List[Dict[str, Any]] = Field(default_factory=list, description="Email attachments")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
-    
-    @validator('sender', 'recipient')
+
+    # The processor mutates in-flight messages (urgency, response_sent,
+    # response_sent_at) on every email; keep those writes plain attribute
+    # stores rather than re-running field validation per assignment.
+    model_config = ConfigDict(validate_assignment=False)
+
+    @field_validator('sender', 'recipient')
+    @classmethod
     def validate_email(cls, v):
-        import re
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, v):
+        if not _EMAIL_RE.match(v):
             raise ValueError('Invalid email address format')
         return v.lower()
-    
-    @validator('urgency')
+
+    @field_validator('urgency', mode='before')
+    @classmethod
     def validate_urgency(cls, v):
         if v is not None and not isinstance(v, UrgencyLevel):
             if isinstance(v, int) and 1 <= v <= 5:
@@ -71,7 +102,8 @@ class AIResponse(BaseModel):
     requires_human_review: bool = Field(False, description="Whether response needs human approval")
     created_at: datetime = Field(default_factory=datetime.now, description="When response was created")
     
-    @validator('confidence_score')
+    @field_validator('confidence_score')
+    @classmethod
     def validate_confidence(cls, v):
         if not 0 <= v <= 1:
             raise ValueError('Confidence score must be between 0 and 1')
@@ -160,62 +192,79 @@ class ConnectionTestResult(BaseModel):
     tested_at: datetime = Field(default_factory=datetime.now, description="Test timestamp")
 
 
-def create_email_from_raw(raw_email: bytes, message_id: str) -> EmailMessage:
-    """Create EmailMessage from raw email bytes"""
+def create_email_from_raw(raw_email: bytes, message_id: str, parse_html: bool = True) -> EmailMessage:
+    """Create EmailMessage from raw email bytes.
+
+    Pass parse_html=False when only the plain-text body matters (urgency
+    scoring, spam checks): HTML parts are usually the largest in the
+    message and skipping them avoids their base64/charset decode cost.
+    """
     try:
         # Parse the raw email
-        msg = email.message_from_bytes(raw_email)
-        
-        # Extract basic information
-        subject = msg.get('Subject', 'No Subject')
-        sender = msg.get('From', '')
-        recipient = msg.get('To', '')
+        msg = parse_full(raw_email)
+
+        # Extract basic information; parseaddr strips any display name
+        # ("Name <a@b.com>" -> "a@b.com")
+        subject = str(msg.get('Subject', 'No Subject'))
+        sender = email.utils.parseaddr(msg.get('From', ''))[1]
+        recipient = email.utils.parseaddr(msg.get('To', ''))[1]
         
-        # Extract body content
+        # Extract body content and attachments in one pass over the MIME
+        # tree, decoding each part's payload exactly once
         body = ""
         html_body = None
-        
-        if msg.is_multipart():
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                if content_type == "text/plain":
-                    body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                elif content_type == "text/html":
-                    html_body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-        else:
-            content_type = msg.get_content_type()
-            if content_type == "text/plain":
-                body = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
-            elif content_type == "text/html":
-                html_body = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
-                body = html_body  # Fallback to HTML if no plain text
-        
-        # Extract attachments
         attachments = []
+
         if msg.is_multipart():
             for part in msg.walk():
                 if part.get_content_disposition() == 'attachment':
                     filename = part.get_filename()
                     if filename:
+                        payload = part.get_payload(decode=True)
                         attachments.append({
                             'filename': filename,
                             'content_type': part.get_content_type(),
-                            'size': len(part.get_payload(decode=True)) if part.get_payload(decode=True) else 0
+                            'size': len(payload) if payload else 0
                         })
+                    continue
+
+                content_type = part.get_content_type()
+                if content_type == "text/plain" and not body:
+                    body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
+                elif content_type == "text/html" and parse_html and html_body is None:
+                    html_body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
+        else:
+            content_type = msg.get_content_type()
+            if content_type == "text/plain":
+                body = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
+            elif content_type == "text/html":
+                decoded = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
+                if parse_html:
+                    html_body = decoded
+                body = decoded  # Fallback to HTML if no plain text
         
-        # Create EmailMessage
-        return EmailMessage(
+        # Addresses are normalized here, so model_construct can skip the
+        # per-field validation pass entirely — this is the hot constructor
+        # (once per fetched message) and the data never comes from callers
+        sender = sender.lower()
+        recipient = recipient.lower()
+        if not _EMAIL_RE.match(sender) or not _EMAIL_RE.match(recipient):
+            raise ValueError('Invalid email address format')
+
+        return EmailMessage.model_construct(
             message_id=message_id,
             subject=subject,
             sender=sender,
+            sender_domain=sender.rpartition('@')[2],
+            sender_local=sender.partition('@')[0],
             recipient=recipient,
             body=body,
             html_body=html_body,
             attachments=attachments,
             metadata={
-                'raw_headers': dict(msg.items()),
+                'raw_headers': {k: str(v) for k, v in msg.items()},
                 'content_type': msg.get_content_type(),
-                'date': msg.get('Date'),
+                'date': str(msg.get('Date', '')) or None,
                 'message_size': len(raw_email)
             }
         )
@@ -232,28 +281,32 @@ def create_email_from_raw(raw_email: bytes, message_id: str) -> EmailMessage:
         )
 
 
+# Pure lookup tables, built once rather than per call
+_URGENCY_LABELS = {
+    UrgencyLevel.VERY_LOW: "Very Low",
+    UrgencyLevel.LOW: "Low",
+    UrgencyLevel.MEDIUM: "Medium",
+    UrgencyLevel.HIGH: "High",
+    UrgencyLevel.URGENT: "Urgent"
+}
+
+_RESPONSE_TYPE_LABELS = {
+    ResponseType.AI_AUTO: "AI Auto-Response",
+    ResponseType.AI_APPROVED: "AI Approved Response",
+    ResponseType.HUMAN_RESPONSE: "Human Response",
+    ResponseType.ESCALATION: "Escalation",
+    ResponseType.FALLBACK: "Fallback Response"
+}
+
+
 def urgency_to_string(urgency: UrgencyLevel) -> str:
     """Convert urgency level to human-readable string"""
-    urgency_map = {
-        UrgencyLevel.VERY_LOW: "Very Low",
-        UrgencyLevel.LOW: "Low",
-        UrgencyLevel.MEDIUM: "Medium",
-        UrgencyLevel.HIGH: "High",
-        UrgencyLevel.URGENT: "Urgent"
-    }
-    return urgency_map.get(urgency, "Unknown")
+    return _URGENCY_LABELS.get(urgency, "Unknown")
 
 
 def response_type_to_string(response_type: ResponseType) -> str:
     """Convert response type to human-readable string"""
-    type_map = {
-        ResponseType.AI_AUTO: "AI Auto-Response",
-        ResponseType.AI_APPROVED: "AI Approved Response",
-        ResponseType.HUMAN_RESPONSE: "Human Response",
-        ResponseType.ESCALATION: "Escalation",
-        ResponseType.FALLBACK: "Fallback Response"
-    }
-    return type_map.get(response_type, "Unknown")
+    return _RESPONSE_TYPE_LABELS.get(response_type, "Unknown")
 
 
 
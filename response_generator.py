@@ -3,84 +3,171 @@ Response Generator - Uses OpenAI to generate email responses
 """
 
 import asyncio
+import hashlib
 import logging
-import json
+import time
+from collections import OrderedDict, defaultdict
 from typing import Optional
+
+import httpx
+import orjson
 from openai import AsyncOpenAI
+from pydantic import BaseModel
 
 from config import Config
 from models import EmailMessage, AIResponse, UrgencyLevel
 
 
+class _CompletionPayload(BaseModel):
+    """Typed view of the JSON object completions are asked to return.
+
+    model_validate_json decodes and validates in one Rust pass, replacing
+    the scattered result.get(...) defaults; unexpected keys the model
+    tacks on are ignored, malformed payloads raise and fall through to
+    the fallback response.
+    """
+    response_text: str = ""
+    confidence_score: float = 0.8
+    reasoning: str = "No reasoning provided"
+    suggested_urgency: int = 3
+    requires_human_review: bool = False
+
+
 class ResponseGenerator:
     """AI-powered email response generator using OpenAI"""
-    
+
+    # How often an offline batch job's status is polled
+    BATCH_POLL_SECONDS = 30
+
+    # A health probe inside this window is trusted without re-checking
+    HEALTH_TTL_SECONDS = 30
+
+    # Generated responses kept for identical repeat emails
+    RESPONSE_CACHE_MAX = 1024
+
     def __init__(self, config: Config):
         self.config = config
         self.logger = logging.getLogger(__name__)
-        self.client = AsyncOpenAI(api_key=config.openai_api_key)
+        # One shared client with an explicitly sized keepalive pool:
+        # concurrent batch generation reuses warm TLS connections instead
+        # of paying a handshake per request
+        self.client = AsyncOpenAI(
+            api_key=config.openai_api_key,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=128,
+                    max_keepalive_connections=64,
+                    keepalive_expiry=30
+                ),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                http2=True
+            )
+        )
         self.is_connected = False
+        self._last_ok_ts = 0.0
+        # Bounds in-flight completions so batch generation doesn't trip
+        # API rate limits
+        self._sem = asyncio.Semaphore(config.max_concurrent_processing)
+        # Pins our requests to one prompt-cache route server-side; the
+        # tone is the only config knob that changes the shared prefix
+        self._prompt_cache_key = f"erespond-{config.response_tone}"
+        # Built once: the prompts depend only on config, which is frozen,
+        # and a byte-stable string also keeps the provider cache key stable
+        self._system_prompt = self._build_system_prompt()
+        self._improve_system_prompt = (
+            "You are an expert email response editor. Improve responses "
+            "based on feedback while maintaining professionalism."
+        )
+        # LRU of responses by content hash: byte-identical repeat emails
+        # (autoresponders, form submissions) skip the model entirely
+        self._resp_cache: OrderedDict = OrderedDict()
     
+    async def aclose(self):
+        """Close the underlying HTTP connection pool at shutdown"""
+        try:
+            await self.client.close()
+        except Exception as e:
+            self.logger.error(f"Error closing OpenAI client: {e}")
+
     async def test_connection(self):
         """Test OpenAI API connection"""
         try:
-            # Test with a simple completion
-            response = await self.client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=[
-                    {"role": "user", "content": "Hello, this is a connection test."}
-                ],
-                max_tokens=10
-            )
-            
+            # models.list is a lightweight GET — no tokens burned, no
+            # multi-second completion latency just to probe reachability
+            await self.client.models.list()
+
             self.is_connected = True
+            self._last_ok_ts = time.monotonic()
             self.logger.info("OpenAI connection test successful")
-            
+
         except Exception as e:
             self.logger.error(f"OpenAI connection test failed: {e}")
             self.is_connected = False
             raise
     
-    async def generate_response(self, email_msg: EmailMessage) -> AIResponse:
-        """Generate AI response for an email"""
+    async def generate_response(self, email_msg: EmailMessage, model: Optional[str] = None) -> AIResponse:
+        """Generate AI response for an email.
+
+        Pass model to override the production model; non-critical paths
+        route to config.openai_model_lite.
+        """
         try:
             self.logger.info(f"Generating response for email: {email_msg.message_id}")
-            
+
+            # Identical content seen before: clone the cached response
+            cache_key = hashlib.blake2b(
+                f"{email_msg.subject}|{email_msg.body}|{self.config.response_tone}".encode(),
+                digest_size=16
+            ).digest()
+            cached = self._resp_cache.get(cache_key)
+            if cached is not None:
+                self._resp_cache.move_to_end(cache_key)
+                self.logger.info(f"Response cache hit for {email_msg.message_id}")
+                return cached.model_copy(update={'message_id': email_msg.message_id})
+
             # Prepare the prompt
             prompt = self._create_response_prompt(email_msg)
-            
+
             # Call OpenAI API
-            response = await self.client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": self._get_system_prompt()
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=self.config.max_response_length,
-                temperature=0.7,
-                response_format={"type": "json_object"}
-            )
+            async with self._sem:
+                response = await self.client.chat.completions.create(
+                    model=model or self.config.openai_model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": self._get_system_prompt()
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    max_tokens=self.config.max_response_length,
+                    temperature=0.7,
+                    response_format={"type": "json_object"},
+                    extra_body={"prompt_cache_key": self._prompt_cache_key}
+                )
             
             # Parse response
-            result = json.loads(response.choices[0].message.content)
-            
+            payload = _CompletionPayload.model_validate_json(response.choices[0].message.content)
+
             ai_response = AIResponse(
                 message_id=email_msg.message_id,
-                response_text=result.get('response_text', ''),
-                confidence_score=result.get('confidence_score', 0.8),
-                reasoning=result.get('reasoning', 'No reasoning provided'),
-                suggested_urgency=UrgencyLevel(result.get('suggested_urgency', 3)),
-                requires_human_review=result.get('requires_human_review', False)
+                response_text=payload.response_text,
+                confidence_score=payload.confidence_score,
+                reasoning=payload.reasoning,
+                suggested_urgency=UrgencyLevel(payload.suggested_urgency),
+                requires_human_review=payload.requires_human_review
             )
             
+            # Cache only real generations — a cached fallback would pin
+            # a degraded answer to this content
+            self._resp_cache[cache_key] = ai_response
+            if len(self._resp_cache) > self.RESPONSE_CACHE_MAX:
+                self._resp_cache.popitem(last=False)
+
             self.logger.info(f"Response generated for {email_msg.message_id} with confidence {ai_response.confidence_score:.2f}")
-            
+
             return ai_response
             
         except Exception as e:
@@ -89,11 +176,21 @@ class ResponseGenerator:
             return self._create_fallback_response(email_msg)
     
     def _get_system_prompt(self) -> str:
-        """Get system prompt for response generation"""
-        return f"""You are a professional email response assistant. Generate appropriate, helpful, and {self.config.response_tone} email responses.
+        """Get the cached system prompt for response generation"""
+        return self._system_prompt
+
+    def _build_system_prompt(self) -> str:
+        """Build the system prompt once at construction.
+
+        Static instructions lead and config-interpolated lines trail:
+        OpenAI's prompt cache keys on exact token prefixes, so keeping
+        the head of the prompt byte-identical across requests is what
+        earns cache hits.
+        """
+        return f"""You are a professional email response assistant. Generate appropriate, helpful email responses.
 
 GUIDELINES:
-- Be {self.config.response_tone} and courteous
+- Be courteous
 - Address the sender's concerns directly
 - Provide helpful information or next steps
 - Keep responses concise but complete
@@ -106,24 +203,16 @@ RESPONSE FORMAT:
 - Use proper email structure (greeting, body, closing)
 - Include a clear subject line suggestion
 - End with appropriate signature
-- Maximum {self.config.max_response_length} characters
 
 TONE: {self.config.response_tone.title()}
+MAXIMUM LENGTH: {self.config.max_response_length} characters
 """
-    
-    def _create_response_prompt(self, email_msg: EmailMessage) -> str:
-        """Create prompt for response generation"""
-        return f"""
-Generate an appropriate email response for the following message.
 
-ORIGINAL EMAIL:
-From: {email_msg.sender}
-Subject: {email_msg.subject}
-Received: {email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S')}
-Urgency Level: {email_msg.urgency.value}/5
-
-CONTENT:
-{email_msg.body}
+    # Scanned for placeholders once at class creation instead of
+    # reflowing a ~500-char f-string per request; static block first,
+    # per-email fields last (see _build_system_prompt)
+    _RESPONSE_PROMPT_TEMPLATE = """
+Generate an appropriate email response for the message below.
 
 Please respond with a JSON object containing:
 - "response_text": the complete email response (including subject line)
@@ -140,7 +229,28 @@ Consider:
 - Appropriate level of detail and formality
 - Whether the response fully addresses the inquiry
 - If additional information or escalation is needed
+
+ORIGINAL EMAIL:
+From: {sender}
+Subject: {subject}
+Received: {received}
+Urgency Level: {urgency}/5
+
+CONTENT:
+{body}
 """
+
+    def _create_response_prompt(self, email_msg: EmailMessage) -> str:
+        """Create prompt for response generation"""
+        return self._RESPONSE_PROMPT_TEMPLATE.format_map({
+            'sender': email_msg.sender,
+            'subject': email_msg.subject,
+            # Same 'YYYY-MM-DD HH:MM:SS' shape as strftime, minus the
+            # format-string parse
+            'received': email_msg.received_at.isoformat(sep=' ', timespec='seconds'),
+            'urgency': email_msg.urgency.value,
+            'body': email_msg.body,
+        })
     
     async def generate_fallback_response(self, email_msg: EmailMessage) -> AIResponse:
         """Generate a safe fallback response when AI generation fails"""
@@ -150,7 +260,7 @@ Consider:
             # Simple fallback response
             fallback_text = f"""Subject: Re: {email_msg.subject}
 
-Dear {email_msg.sender.split('@')[0]},
+Dear {email_msg.sender_local or email_msg.sender.partition('@')[0]},
 
 Thank you for your email regarding "{email_msg.subject}".
 
@@ -194,10 +304,12 @@ Customer Service Team
                 subject="Test Email",
                 sender="test@example.com",
                 recipient=self.config.smtp_email,
-                body="This is a test email to verify the response generation system."
+                body="This is a test email to verify the response generation system.",
+                urgency=UrgencyLevel.LOW
             )
-            
-            return await self.generate_response(test_email)
+
+            # System tests don't need production-model quality
+            return await self.generate_response(test_email, model=self.config.openai_model_lite)
             
         except Exception as e:
             self.logger.error(f"Error generating test response: {e}")
@@ -210,11 +322,59 @@ Customer Service Team
                 requires_human_review=False
             )
     
+    # Casual phrases rewritten by the "more formal" local edit
+    _FORMALIZE_MAP = (
+        ("Hi ", "Dear "),
+        ("Hey ", "Dear "),
+        ("Thanks", "Thank you"),
+        ("Cheers", "Best regards"),
+    )
+
+    def _apply_local_feedback(self, response_text: str, feedback: str) -> Optional[str]:
+        """Handle well-known structural feedback without a model call.
+
+        Returns the edited text, or None when the feedback is freeform
+        and actually needs the model.
+        """
+        fb = feedback.lower()
+        text = response_text
+        handled = False
+
+        if 'shorten' in fb or 'shorter' in fb:
+            target = len(text) // 2
+            # Cut at the last sentence boundary before the midpoint
+            boundary = text.rfind('.', 0, target)
+            text = text[:boundary + 1] if boundary > 0 else text[:target]
+            handled = True
+
+        if 'more formal' in fb or 'formalize' in fb:
+            for casual, formal in self._FORMALIZE_MAP:
+                text = text.replace(casual, formal)
+            handled = True
+
+        if 'add signature' in fb:
+            text = f"{text.rstrip()}\n\nBest regards,\nCustomer Service Team\n{self.config.smtp_email}\n"
+            handled = True
+
+        return text if handled else None
+
     async def improve_response(self, original_response: AIResponse, feedback: str) -> AIResponse:
-        """Improve a response based on feedback"""
+        """Improve a response based on feedback.
+
+        Structural feedback (shorten, more formal, add signature) is
+        applied locally; only freeform feedback costs a completion.
+        """
         try:
             self.logger.info(f"Improving response for email: {original_response.message_id}")
-            
+
+            local = self._apply_local_feedback(original_response.response_text, feedback)
+            if local is not None:
+                self.logger.info(f"Applied local edit for {original_response.message_id}")
+                return original_response.model_copy(update={
+                    'response_text': local,
+                    'reasoning': f"Local edit applied for feedback: {feedback}"
+                })
+
             prompt = f"""
 Improve the following email response based on the provided feedback.
 
@@ -233,24 +393,25 @@ Respond with a JSON object containing:
 - "changes_made": list of specific changes implemented
 """
             
-            response = await self.client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert email response editor. Improve responses based on feedback while maintaining professionalism."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=self.config.max_response_length,
-                temperature=0.5,
-                response_format={"type": "json_object"}
-            )
+            async with self._sem:
+                response = await self.client.chat.completions.create(
+                    model=self.config.openai_model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": self._improve_system_prompt
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    max_tokens=self.config.max_response_length,
+                    temperature=0.5,
+                    response_format={"type": "json_object"}
+                )
             
-            result = json.loads(response.choices[0].message.content)
+            result = orjson.loads(response.choices[0].message.content)
             
             improved_response = AIResponse(
                 message_id=original_response.message_id,
@@ -268,34 +429,146 @@ Respond with a JSON object containing:
             self.logger.error(f"Error improving response: {e}")
             return original_response  # Return original if improvement fails
     
+    @staticmethod
+    def _content_signature(email_msg: EmailMessage) -> bytes:
+        """Digest of the content fields that make two emails near-duplicates"""
+        return hashlib.blake2b(
+            (email_msg.subject.strip().lower() + '\n' + email_msg.body[:512]).encode(),
+            digest_size=16
+        ).digest()
+
     async def generate_batch_responses(self, emails: list[EmailMessage]) -> list[AIResponse]:
-        """Generate responses for multiple emails"""
+        """Generate responses for multiple emails.
+
+        Near-duplicates (same normalized subject and body prefix — form
+        submissions, autoresponders) share one model call whose response
+        is cloned per member, so a batch costs one completion per unique
+        template. The unique completions run concurrently (bounded by
+        the semaphore), so the batch takes roughly one per-call latency
+        instead of the sum.
+        """
         try:
             self.logger.info(f"Generating batch responses for {len(emails)} emails")
-            
+
+            groups: dict = defaultdict(list)
+            for email_msg in emails:
+                groups[self._content_signature(email_msg)].append(email_msg)
+
+            representatives = [members[0] for members in groups.values()]
+            tasks = [asyncio.create_task(self.generate_response(e)) for e in representatives]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+            by_signature = {}
+            for key, rep, result in zip(groups.keys(), representatives, results):
+                if isinstance(result, Exception):
+                    self.logger.error(f"Error generating response for {rep.message_id}: {result}")
+                    result = None
+                by_signature[key] = result
+
             responses = []
             for email_msg in emails:
-                try:
-                    response = await self.generate_response(email_msg)
-                    responses.append(response)
-                except Exception as e:
-                    self.logger.error(f"Error generating response for {email_msg.message_id}: {e}")
-                    # Add fallback response
-                    fallback = self._create_fallback_response(email_msg)
-                    responses.append(fallback)
-            
-            self.logger.info(f"Batch response generation completed: {len(responses)} responses")
+                result = by_signature[self._content_signature(email_msg)]
+                if result is None:
+                    responses.append(self._create_fallback_response(email_msg))
+                else:
+                    responses.append(result.model_copy(update={'message_id': email_msg.message_id}))
+
+            self.logger.info(
+                f"Batch response generation completed: {len(responses)} responses "
+                f"from {len(representatives)} model calls")
             return responses
-            
+
         except Exception as e:
             self.logger.error(f"Error in batch response generation: {e}")
             return []
-    
+
+    async def generate_batch_responses_offline(self, emails: list[EmailMessage]) -> list[AIResponse]:
+        """Generate responses via the OpenAI Batch API.
+
+        Batch jobs run at roughly half the per-token cost of live
+        completions but may take up to 24 hours, so this path is for
+        non-interactive backlogs of config.batch_threshold emails or
+        more — digests, re-processing runs — never for live replies.
+        Results come back keyed by custom_id (the message_id), in the
+        same order as the input; any email the job fails to answer gets
+        the fallback response.
+        """
+        try:
+            self.logger.info(f"Submitting offline batch for {len(emails)} emails")
+
+            lines = []
+            for email_msg in emails:
+                lines.append(orjson.dumps({
+                    "custom_id": email_msg.message_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": self.config.openai_model,
+                        "messages": [
+                            {"role": "system", "content": self._get_system_prompt()},
+                            {"role": "user", "content": self._create_response_prompt(email_msg)}
+                        ],
+                        "max_tokens": self.config.max_response_length,
+                        "temperature": 0.7,
+                        "response_format": {"type": "json_object"}
+                    }
+                }))
+
+            batch_file = await self.client.files.create(
+                file=("batch.jsonl", b"\n".join(lines)),
+                purpose="batch"
+            )
+            batch = await self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                await asyncio.sleep(self.BATCH_POLL_SECONDS)
+                batch = await self.client.batches.retrieve(batch.id)
+
+            if batch.status != "completed":
+                self.logger.error(f"Batch job {batch.id} ended with status {batch.status}")
+                return [self._create_fallback_response(e) for e in emails]
+
+            output = await self.client.files.content(batch.output_file_id)
+
+            responses_by_id = {}
+            for line in output.text.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = orjson.loads(line)
+                    body = record["response"]["body"]
+                    payload = _CompletionPayload.model_validate_json(
+                        body["choices"][0]["message"]["content"])
+                    responses_by_id[record["custom_id"]] = AIResponse(
+                        message_id=record["custom_id"],
+                        response_text=payload.response_text,
+                        confidence_score=payload.confidence_score,
+                        reasoning=payload.reasoning,
+                        suggested_urgency=UrgencyLevel(payload.suggested_urgency),
+                        requires_human_review=payload.requires_human_review
+                    )
+                except Exception as e:
+                    self.logger.error(f"Error parsing batch output line: {e}")
+
+            self.logger.info(f"Offline batch completed: {len(responses_by_id)}/{len(emails)} responses")
+            return [
+                responses_by_id.get(e.message_id) or self._create_fallback_response(e)
+                for e in emails
+            ]
+
+        except Exception as e:
+            self.logger.error(f"Error in offline batch generation: {e}")
+            return [self._create_fallback_response(e) for e in emails]
+
     def _create_fallback_response(self, email_msg: EmailMessage) -> AIResponse:
         """Create a simple fallback response"""
         fallback_text = f"""Subject: Re: {email_msg.subject}
 
-Dear {email_msg.sender.split('@')[0]},
+Dear {email_msg.sender_local or email_msg.sender.partition('@')[0]},
 
 Thank you for your email. We have received your message and will respond as soon as possible.
 
@@ -312,17 +585,23 @@ Customer Service Team
             requires_human_review=False
         )
     
-    async def is_connected(self) -> bool:
-        """Check if OpenAI API is accessible"""
+    async def ensure_connected(self) -> bool:
+        """Check if OpenAI API is accessible.
+
+        A success inside the last HEALTH_TTL_SECONDS is trusted without a
+        round trip; otherwise the cheapest endpoint (models.list) is
+        probed rather than burning a completion.
+        """
         try:
-            response = await self.client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=1
-            )
+            if time.monotonic() - self._last_ok_ts < self.HEALTH_TTL_SECONDS:
+                return True
+            await self.client.models.list()
+            self._last_ok_ts = time.monotonic()
+            self.is_connected = True
             return True
         except Exception as e:
             self.logger.warning(f"OpenAI connection check failed: {e}")
+            self.is_connected = False
             return False
     
     def get_generation_stats(self) -> dict:
@@ -7,23 +7,52 @@ import hmac
 import secrets
 import re
 import logging
+import time
+from collections import defaultdict, deque
 from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import jwt
 from cryptography.fernet import Fernet
 from email_validator import validate_email, EmailNotValidError
 
 logger = logging.getLogger(__name__)
 
+# Validator patterns, compiled once at import instead of per call
+_RE_UPPER = re.compile(r'[A-Z]')
+_RE_LOWER = re.compile(r'[a-z]')
+_RE_DIGIT = re.compile(r'\d')
+_RE_SPECIAL = re.compile(r'[!@#$%^&*(),.?":{}|<>]')
+
+# One alternation scans the password once instead of one pass per pattern
+_RE_WEAK = re.compile(r'password|123456|qwerty|admin|user')
+
+_RE_URL = re.compile(
+    r'^https?://'  # http:// or https://
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
+    r'localhost|'  # localhost...
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
+    r'(?::\d+)?'  # optional port
+    r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+
+# Strips markup/control characters in one C-level pass via str.translate
+_SANITIZE_TABLE = str.maketrans('', '', '<>"\'&\x00\r\n')
+
 
 class SecurityManager:
     """Centralized security management"""
-    
+
+    # PBKDF2 work factor; a constant so it can be tuned in one place
+    PBKDF2_ITERATIONS = 100_000
+
     def __init__(self, secret_key: str = None):
         self.secret_key = secret_key or self._generate_secret_key()
+        # Encoded once; every JWT encode/decode reuses the same key bytes
+        self._jwt_key = self.secret_key.encode() if isinstance(self.secret_key, str) else self.secret_key
         self.encryption_key = Fernet.generate_key()
         self.cipher_suite = Fernet(self.encryption_key)
-        self.rate_limits: Dict[str, List[datetime]] = {}
+        # Per-identifier monotonic timestamps; deques evict expired
+        # entries from the left instead of rebuilding a list per check
+        self.rate_limits: Dict[str, deque] = defaultdict(deque)
         self.blocked_ips: set = set()
         self.allowed_ips: set = set()
     
@@ -32,17 +61,26 @@ class SecurityManager:
         return secrets.token_urlsafe(32)
     
     def hash_password(self, password: str) -> str:
-        """Hash a password using PBKDF2"""
-        salt = secrets.token_hex(16)
-        pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-        return f"{salt}:{pwd_hash.hex()}"
+        """Hash a password using PBKDF2.
+
+        The salt is raw bytes end to end — token_hex plus a second
+        .encode() paid two encodings for no entropy gain — and only the
+        stored representation is hex.
+        """
+        salt = secrets.token_bytes(16)
+        pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, self.PBKDF2_ITERATIONS)
+        return f"{salt.hex()}:{pwd_hash.hex()}"
     
     def verify_password(self, password: str, hashed: str) -> bool:
         """Verify a password against its hash"""
         try:
-            salt, hash_hex = hashed.split(':')
-            pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-            return hmac.compare_digest(pwd_hash.hex(), hash_hex)
+            salt_hex, hash_hex = hashed.split(':', 1)
+            # Compare the raw digests; hex-encoding the computed hash
+            # just doubled the bytes fed to compare_digest
+            stored = bytes.fromhex(hash_hex)
+            computed = hashlib.pbkdf2_hmac(
+                'sha256', password.encode(), bytes.fromhex(salt_hex), self.PBKDF2_ITERATIONS)
+            return hmac.compare_digest(stored, computed)
         except (ValueError, TypeError):
             return False
     
@@ -66,14 +104,15 @@ class SecurityManager:
     
     def generate_jwt_token(self, payload: Dict[str, Any], expires_in_hours: int = 24) -> str:
         """Generate JWT token"""
-        payload['exp'] = datetime.utcnow() + timedelta(hours=expires_in_hours)
-        payload['iat'] = datetime.utcnow()
-        return jwt.encode(payload, self.secret_key, algorithm='HS256')
-    
+        now = datetime.now(timezone.utc)
+        payload['exp'] = now + timedelta(hours=expires_in_hours)
+        payload['iat'] = now
+        return jwt.encode(payload, self._jwt_key, algorithm='HS256')
+
     def verify_jwt_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify JWT token"""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=['HS256'])
+            payload = jwt.decode(token, self._jwt_key, algorithms=['HS256'])
             return payload
         except jwt.ExpiredSignatureError:
             logger.warning("JWT token has expired")
@@ -84,23 +123,20 @@ class SecurityManager:
     
     def check_rate_limit(self, identifier: str, max_requests: int = 100, window_minutes: int = 60) -> bool:
         """Check if request is within rate limit"""
-        now = datetime.now()
-        window_start = now - timedelta(minutes=window_minutes)
-        
-        # Clean old requests
-        if identifier in self.rate_limits:
-            self.rate_limits[identifier] = [
-                req_time for req_time in self.rate_limits[identifier]
-                if req_time > window_start
-            ]
-        else:
-            self.rate_limits[identifier] = []
-        
+        now = time.monotonic()
+        window_start = now - window_minutes * 60
+
+        # Timestamps are appended in order, so everything expired sits at
+        # the left end — pop until the head is inside the window
+        timestamps = self.rate_limits[identifier]
+        while timestamps and timestamps[0] <= window_start:
+            timestamps.popleft()
+
         # Check if under limit
-        if len(self.rate_limits[identifier]) < max_requests:
-            self.rate_limits[identifier].append(now)
+        if len(timestamps) < max_requests:
+            timestamps.append(now)
             return True
-        
+
         return False
     
     def is_ip_blocked(self, ip_address: str) -> bool:
@@ -154,36 +190,26 @@ class InputValidator:
             result['issues'].append("Password must be at least 8 characters long")
             result['is_valid'] = False
         
-        if not re.search(r'[A-Z]', password):
+        if not _RE_UPPER.search(password):
             result['issues'].append("Password must contain at least one uppercase letter")
             result['score'] += 1
-        
-        if not re.search(r'[a-z]', password):
+
+        if not _RE_LOWER.search(password):
             result['issues'].append("Password must contain at least one lowercase letter")
             result['score'] += 1
-        
-        if not re.search(r'\d', password):
+
+        if not _RE_DIGIT.search(password):
             result['issues'].append("Password must contain at least one digit")
             result['score'] += 1
-        
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
+
+        if not _RE_SPECIAL.search(password):
             result['issues'].append("Password must contain at least one special character")
             result['score'] += 1
-        
+
         # Check for common weak patterns
-        weak_patterns = [
-            r'password',
-            r'123456',
-            r'qwerty',
-            r'admin',
-            r'user'
-        ]
-        
-        for pattern in weak_patterns:
-            if re.search(pattern, password.lower()):
-                result['issues'].append("Password contains common weak patterns")
-                result['score'] -= 1
-                break
+        if _RE_WEAK.search(password.lower()):
+            result['issues'].append("Password contains common weak patterns")
+            result['score'] -= 1
         
         if result['score'] >= 3:
             result['is_valid'] = True
@@ -193,14 +219,7 @@ class InputValidator:
     @staticmethod
     def validate_url(url: str) -> bool:
         """Validate URL format"""
-        url_pattern = re.compile(
-            r'^https?://'  # http:// or https://
-            r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
-            r'localhost|'  # localhost...
-            r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
-            r'(?::\d+)?'  # optional port
-            r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-        return bool(url_pattern.match(url))
+        return bool(_RE_URL.match(url))
     
     @staticmethod
     def validate_api_key_format(api_key: str, service: str) -> bool:
@@ -217,20 +236,14 @@ class InputValidator:
         """Sanitize user input"""
         if not text:
             return ""
-        
-        # Remove null bytes
-        text = text.replace('\x00', '')
-        
+
         # Truncate if too long
         if len(text) > max_length:
             text = text[:max_length]
-        
-        # Remove potentially dangerous characters
-        dangerous_chars = ['<', '>', '"', "'", '&', '\x00', '\r', '\n']
-        for char in dangerous_chars:
-            text = text.replace(char, '')
-        
-        return text.strip()
+
+        # Remove null bytes and potentially dangerous characters in a
+        # single pass instead of one .replace() walk per character
+        return text.translate(_SANITIZE_TABLE).strip()
     
     @staticmethod
     def validate_file_upload(filename: str, content_type: str, max_size: int = 10 * 1024 * 1024) -> Dict[str, Any]:
@@ -275,15 +288,20 @@ class InputValidator:
 class SecurityAuditor:
     """Security audit and monitoring"""
     
+    # Events retained; older ones fall off the left automatically
+    MAX_EVENTS = 1000
+
     def __init__(self):
-        self.security_events: List[Dict[str, Any]] = []
+        self.security_events: deque = deque(maxlen=self.MAX_EVENTS)
         self.failed_attempts: Dict[str, int] = {}
         self.suspicious_activities: List[Dict[str, Any]] = []
     
     def log_security_event(self, event_type: str, details: Dict[str, Any], severity: str = "INFO"):
         """Log a security event"""
+        # Only the epoch float is stored; the ISO timestamp is rendered
+        # at report time for the handful of events that surface there
         event = {
-            'timestamp': datetime.now().isoformat(),
+            'ts': time.time(),
             'event_type': event_type,
             'severity': severity,
             'details': details
@@ -298,10 +316,6 @@ class SecurityAuditor:
             logger.warning(f"Security event: {event_type} - {details}")
         else:
             logger.info(f"Security event: {event_type} - {details}")
-        
-        # Keep only last 1000 events
-        if len(self.security_events) > 1000:
-            self.security_events = self.security_events[-1000:]
     
     def record_failed_attempt(self, identifier: str, attempt_type: str):
         """Record a failed authentication attempt"""
@@ -339,12 +353,12 @@ class SecurityAuditor:
     
     def get_security_report(self) -> Dict[str, Any]:
         """Generate security report"""
-        now = datetime.now()
-        last_24h = now - timedelta(hours=24)
-        
+        cutoff = time.time() - 24 * 3600
+
+        # Float compare per event instead of re-parsing every ISO string
         recent_events = [
             event for event in self.security_events
-            if datetime.fromisoformat(event['timestamp']) > last_24h
+            if event['ts'] > cutoff
         ]
         
         critical_events = [event for event in recent_events if event['severity'] == 'CRITICAL']
@@ -356,7 +370,10 @@ class SecurityAuditor:
             'warning_events': len(warning_events),
             'failed_attempts': len(self.failed_attempts),
             'suspicious_activities': len(self.suspicious_activities),
-            'recent_critical_events': critical_events[-5:],  # Last 5 critical events
+            'recent_critical_events': [
+                {**event, 'timestamp': datetime.fromtimestamp(event['ts']).isoformat()}
+                for event in critical_events[-5:]  # Last 5 critical events
+            ],
             'top_failed_attempts': dict(list(self.failed_attempts.items())[:10])  # Top 10
         }
 
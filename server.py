@@ -5,20 +5,33 @@ Production-ready FastAPI server with WebSocket support
 """
 
 import asyncio
-import json
 import logging
 import os
+import re
 import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+import orjson
 import uvicorn
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field, field_validator
 import websockets
 
 # Add current directory to path for imports
@@ -43,20 +56,36 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Email Automation System",
     description="AI-powered email response system with intelligent routing",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware
-app.middleware("http")(CORSMiddleware(
+# CORS middleware (was previously registered via app.middleware("http"),
+# which instantiated CORSMiddleware incorrectly and broke app import)
+app.add_middleware(
+    CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-))
+)
+
+# Compress sizeable responses; log tails and config exports are highly
+# repetitive text, so gzip cuts them 5-20x for remote dashboards
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Compiled once: these run on every /api/config and /api/test-connections
+# POST, so the patterns must not be rebuilt per request.
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_HOST_RE = re.compile(r'[A-Za-z0-9]([A-Za-z0-9.-]*[A-Za-z0-9])?')
+
+# Channel used to fan WebSocket events out across uvicorn workers
+EVENTS_CHANNEL = "erespond:events"
 
 # Global state
 email_processor: Optional[EmailProcessor] = None
 config: Optional[Config] = None
+redis_client = None  # set during startup when REDIS_URL is configured
 connected_clients: set = set()
 system_stats = {
     "emails_processed": 0,
@@ -96,6 +125,20 @@ class ConfigRequest(BaseModel):
     log_file: Optional[str] = Field("email_automation.log", description="Log file path")
     redis_url: Optional[str] = Field(None, description="Redis connection URL")
 
+    @field_validator('imap_email', 'smtp_email')
+    @classmethod
+    def validate_email_address(cls, v):
+        if not _EMAIL_RE.fullmatch(v):
+            raise ValueError('Invalid email address format')
+        return v
+
+    @field_validator('imap_host', 'smtp_host')
+    @classmethod
+    def validate_host(cls, v):
+        if not _HOST_RE.fullmatch(v):
+            raise ValueError('Invalid server hostname')
+        return v
+
 class TestConnectionsRequest(BaseModel):
     imap_host: str
     imap_port: int
@@ -108,6 +151,20 @@ class TestConnectionsRequest(BaseModel):
     openai_api_key: str
     google_chat_webhook_url: str
 
+    @field_validator('imap_email', 'smtp_email')
+    @classmethod
+    def validate_email_address(cls, v):
+        if not _EMAIL_RE.fullmatch(v):
+            raise ValueError('Invalid email address format')
+        return v
+
+    @field_validator('imap_host', 'smtp_host')
+    @classmethod
+    def validate_host(cls, v):
+        if not _HOST_RE.fullmatch(v):
+            raise ValueError('Invalid server hostname')
+        return v
+
 class ConnectionTestResult(BaseModel):
     success: bool
     error: Optional[str] = None
@@ -122,19 +179,46 @@ class SystemStatus(BaseModel):
 
 # WebSocket connection manager
 class ConnectionManager:
+    """Tracks WebSocket clients, each with its own bounded send queue
+
+    broadcast() never awaits a socket directly: it drops the message into
+    each client's queue and a per-connection writer task drains it. A slow
+    client therefore only loses its own oldest updates (status messages
+    supersede each other anyway) instead of stalling the broadcaster.
+    """
+
+    QUEUE_MAX = 16
+
     def __init__(self):
-        self.active_connections: list[WebSocket] = []
+        self.active_connections: dict = {}
+        self._writers: dict = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        queue = asyncio.Queue(maxsize=self.QUEUE_MAX)
+        self.active_connections[websocket] = queue
+        self._writers[websocket] = asyncio.create_task(self._writer(websocket, queue))
         logger.info(f"WebSocket client connected. Total connections: {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.pop(websocket, None)
+        writer = self._writers.pop(websocket, None)
+        if writer is not None:
+            writer.cancel()
         logger.info(f"WebSocket client disconnected. Total connections: {len(self.active_connections)}")
 
+    async def _writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Drain one connection's queue onto its socket"""
+        try:
+            while True:
+                message = await queue.get()
+                await websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error broadcasting to WebSocket: {e}")
+            self.disconnect(websocket)
+
     async def send_personal_message(self, message: str, websocket: WebSocket):
         try:
             await websocket.send_text(message)
@@ -142,20 +226,53 @@ class ConnectionManager:
             logger.error(f"Error sending WebSocket message: {e}")
 
     async def broadcast(self, message: str):
-        disconnected = []
-        for connection in self.active_connections:
+        """Queue a message for every client, dropping the oldest on overflow"""
+        for queue in list(self.active_connections.values()):
             try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to WebSocket: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                try:
+                    queue.get_nowait()
+                    queue.put_nowait(message)
+                except (asyncio.QueueEmpty, asyncio.QueueFull):
+                    pass
 
 manager = ConnectionManager()
 
+
+async def publish_event(message: str):
+    """Deliver a message to every connected dashboard client.
+
+    When Redis is configured the message goes through pub/sub, so clients
+    attached to other uvicorn workers receive it too; each worker's
+    subscriber task relays channel traffic to its local connections.
+    Without Redis the message is broadcast to this process only, which is
+    correct for the default single-worker deployment.
+    """
+    if redis_client is not None:
+        try:
+            await redis_client.publish(EVENTS_CHANNEL, message)
+            return
+        except Exception as e:
+            logger.error(f"Error publishing event to Redis: {e}")
+    await manager.broadcast(message)
+
+
+async def redis_subscriber_task():
+    """Relay messages from the shared Redis channel to local WebSocket clients"""
+    try:
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe(EVENTS_CHANNEL)
+        async for item in pubsub.listen():
+            if item.get("type") != "message":
+                continue
+            data = item["data"]
+            if isinstance(data, bytes):
+                data = data.decode()
+            await manager.broadcast(data)
+    except Exception as e:
+        logger.error(f"Redis subscriber task stopped: {e}")
+
 # API Routes
 
 @app.get("/")
@@ -190,25 +307,22 @@ async def save_config(config_request: ConfigRequest):
         # Create new config object
         new_config = Config(**config_request.dict())
         
-        # Save to environment file
-        env_file = Path(".env")
-        env_content = []
-        
         # Add all configuration to .env file
+        env_content = []
         for field, value in config_request.dict().items():
             if value is not None:
                 env_content.append(f"{field.upper()}={value}")
-        
-        with open(env_file, 'w') as f:
-            f.write('\n'.join(env_content))
-        
+
+        # Write off-loop so a slow disk doesn't stall other requests
+        await asyncio.to_thread(Path(".env").write_text, '\n'.join(env_content))
+
         # Update global config
         config = new_config
         
         # Restart email processor if running
         if email_processor and email_processor.is_running:
             await email_processor.stop()
-            email_processor = EmailProcessor(config)
+            email_processor = await asyncio.to_thread(EmailProcessor, config)
             await email_processor.start()
         
         logger.info("Configuration saved successfully")
@@ -220,64 +334,41 @@ async def save_config(config_request: ConfigRequest):
 
 @app.post("/api/test-connections")
 async def test_connections(request: TestConnectionsRequest):
-    """Test all external connections"""
+    """Test all external connections concurrently
+
+    The four probes are independent network calls, so they run in
+    parallel; total latency is the slowest probe rather than the sum
+    of all four.
+    """
     try:
-        results = {}
-        
-        # Test IMAP connection
-        try:
-            from imap_listener import IMAPListener
-            test_config = Config(
-                imap_host=request.imap_host,
-                imap_port=request.imap_port,
-                imap_email=request.imap_email,
-                imap_password=request.imap_password,
-                smtp_host=request.smtp_host,
-                smtp_port=request.smtp_port,
-                smtp_email=request.smtp_email,
-                smtp_password=request.smtp_password,
-                openai_api_key=request.openai_api_key,
-                google_chat_webhook_url=request.google_chat_webhook_url
-            )
-            
-            imap_listener = IMAPListener(test_config)
-            await imap_listener.test_connection()
-            results["imap"] = ConnectionTestResult(success=True)
-        except Exception as e:
-            results["imap"] = ConnectionTestResult(success=False, error=str(e))
-        
-        # Test SMTP connection
-        try:
-            from email_sender import EmailSender
-            email_sender = EmailSender(test_config)
-            await email_sender.test_connection()
-            results["smtp"] = ConnectionTestResult(success=True)
-        except Exception as e:
-            results["smtp"] = ConnectionTestResult(success=False, error=str(e))
-        
-        # Test OpenAI connection
-        try:
-            from urgency_classifier import UrgencyClassifier
-            classifier = UrgencyClassifier(test_config)
-            await classifier.test_connection()
-            results["openai"] = ConnectionTestResult(success=True)
-        except Exception as e:
-            results["openai"] = ConnectionTestResult(success=False, error=str(e))
-        
-        # Test Google Chat connection
-        try:
-            from google_chat_handler import GoogleChatHandler
-            chat_handler = GoogleChatHandler(test_config)
-            await chat_handler.test_connection()
-            results["google_chat"] = ConnectionTestResult(success=True)
-        except Exception as e:
-            results["google_chat"] = ConnectionTestResult(success=False, error=str(e))
-        
-        # Overall result
-        results["all_success"] = all(result.success for result in results.values() if isinstance(result, ConnectionTestResult))
-        
+        from imap_listener import IMAPListener
+        from email_sender import EmailSender
+        from urgency_classifier import UrgencyClassifier
+        from google_chat_handler import GoogleChatHandler
+
+        # Field names mirror Config, so the request maps straight through;
+        # built once and shared by all four probes.
+        test_config = Config(**request.dict())
+
+        async def _test(coro) -> ConnectionTestResult:
+            try:
+                await coro
+                return ConnectionTestResult.model_construct(success=True)
+            except Exception as e:
+                return ConnectionTestResult.model_construct(success=False, error=str(e))
+
+        names = ("imap", "smtp", "openai", "google_chat")
+        outcomes = await asyncio.gather(
+            _test(IMAPListener(test_config).test_connection()),
+            _test(EmailSender(test_config).test_connection()),
+            _test(UrgencyClassifier(test_config).test_connection()),
+            _test(GoogleChatHandler(test_config).test_connection())
+        )
+
+        results = dict(zip(names, outcomes))
+        results["all_success"] = all(result.success for result in outcomes)
         return results
-        
+
     except Exception as e:
         logger.error(f"Error testing connections: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -295,7 +386,7 @@ async def start_system():
             return {"message": "System is already running"}
         
         # Create and start email processor
-        email_processor = EmailProcessor(config)
+        email_processor = await asyncio.to_thread(EmailProcessor, config)
         await email_processor.start()
         
         # Start background task for status updates
@@ -331,24 +422,31 @@ async def stop_system():
 async def get_system_status():
     """Get current system status"""
     try:
+        # One timestamp per request, shared by whichever branch answers.
+        # Fields are produced in-process, so skip re-validation on this
+        # per-tick path and construct the response model directly.
+        last_check = datetime.now().isoformat()
         if not email_processor:
-            return SystemStatus(
+            return SystemStatus.model_construct(
                 is_running=False,
                 imap=False,
                 smtp=False,
                 openai=False,
                 google_chat=False,
-                last_check=datetime.now().isoformat()
+                last_check=last_check
             )
-        
+
+        # get_status returns the models.SystemStatus pydantic model, not a
+        # dict; the old dict-style .get() lookups raised on every call and
+        # turned this endpoint into a guaranteed 500.
         status = await email_processor.get_status()
-        return SystemStatus(
+        return SystemStatus.model_construct(
             is_running=email_processor.is_running,
-            imap=status.get("imap", False),
-            smtp=status.get("smtp", False),
-            openai=status.get("openai", False),
-            google_chat=status.get("google_chat", False),
-            last_check=datetime.now().isoformat()
+            imap=status.imap_connected,
+            smtp=status.smtp_connected,
+            openai=status.openai_connected,
+            google_chat=status.google_chat_connected,
+            last_check=last_check
         )
         
     except Exception as e:
@@ -375,20 +473,35 @@ async def test_email():
         logger.error(f"Error testing email: {e}")
         return {"success": False, "error": str(e)}
 
+# How much of the log file /api/logs returns; the dashboard only shows
+# recent activity, so reading the whole (unbounded) file wastes memory.
+LOG_TAIL_BYTES = 64 * 1024
+
+def _read_log_tail(log_file: Path) -> bytes:
+    """Read the last LOG_TAIL_BYTES of the log, trimming any partial first line"""
+    with open(log_file, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - LOG_TAIL_BYTES))
+        data = f.read()
+    if size > LOG_TAIL_BYTES:
+        data = data.partition(b'\n')[2]
+    return data
+
 @app.get("/api/logs")
 async def get_logs():
-    """Get system logs"""
+    """Get the tail of the system logs"""
     try:
         log_file = Path("email_automation.log")
-        if log_file.exists():
-            with open(log_file, 'r') as f:
-                logs = f.read()
-            return logs
-        else:
-            return "No logs available"
+        if not log_file.exists():
+            return PlainTextResponse("No logs available")
+
+        # Read off-loop so a slow disk doesn't stall other requests
+        data = await asyncio.to_thread(_read_log_tail, log_file)
+        return PlainTextResponse(data.decode('utf-8', errors='replace'))
     except Exception as e:
         logger.error(f"Error reading logs: {e}")
-        return f"Error reading logs: {e}"
+        return PlainTextResponse(f"Error reading logs: {e}")
 
 @app.get("/api/config/export")
 async def export_config():
@@ -426,27 +539,54 @@ async def websocket_endpoint(websocket: WebSocket):
 
 # Background tasks
 async def status_update_task():
-    """Background task to send status updates via WebSocket"""
+    """Forward processor state-transition events to WebSocket clients
+
+    Replaces the fixed 5-second polling broadcast: the task blocks on the
+    processor's event bus and only encodes and sends when something
+    actually happened, so idle dashboards cost nothing and active ones
+    see sub-second updates.
+    """
     while True:
         try:
-            if email_processor and email_processor.is_running:
-                status = await email_processor.get_status()
-                message = {
+            processor = email_processor
+            if processor is None:
+                await asyncio.sleep(5)
+                continue
+            event = await processor.event_bus.get()
+            # Translate bus events into the message shapes app.js handles
+            # (status_update / stats_update / activity); raw event types
+            # would be silently dropped by the dashboard.
+            ts = datetime.now().isoformat()
+            messages = []
+            if event["type"] == "email_processed":
+                messages.append({
+                    "type": "stats_update",
+                    "stats": event.get("stats", {}),
+                    "timestamp": ts
+                })
+                messages.append({
+                    "type": "activity",
+                    "activity": {
+                        "message": f"Processed email {event.get('message_id', '?')} (urgency {event.get('urgency', '?')}/5)",
+                        "timestamp": ts
+                    },
+                    "timestamp": ts
+                })
+            else:  # system_started / system_stopped
+                status = await processor.get_status()
+                messages.append({
                     "type": "status_update",
-                    "status": status,
-                    "timestamp": datetime.now().isoformat()
-                }
-                await manager.broadcast(json.dumps(message))
-            
-            # Update stats
-            stats_message = {
-                "type": "stats_update",
-                "stats": system_stats,
-                "timestamp": datetime.now().isoformat()
-            }
-            await manager.broadcast(json.dumps(stats_message))
-            
-            await asyncio.sleep(5)  # Update every 5 seconds
+                    "status": {
+                        "is_running": status.is_running,
+                        "imap": status.imap_connected,
+                        "smtp": status.smtp_connected,
+                        "openai": status.openai_connected,
+                        "google_chat": status.google_chat_connected
+                    },
+                    "timestamp": ts
+                })
+            for message in messages:
+                await publish_event(orjson.dumps(message).decode())
         except Exception as e:
             logger.error(f"Error in status update task: {e}")
             await asyncio.sleep(10)
@@ -457,14 +597,32 @@ async def startup_event():
     """Initialize the application on startup"""
     global config
     try:
+        # Log which event loop implementation we ended up with (uvloop when available)
+        loop = asyncio.get_running_loop()
+        logger.info(f"Event loop: {type(loop).__module__}.{type(loop).__name__}")
+
         # Load configuration
         config = load_config()
         logger.info("Configuration loaded successfully")
-        
-        # Create email processor (but don't start it yet)
+
+        # Connect to Redis so events reach clients on every worker
+        if aioredis is not None and config.redis_url:
+            global redis_client
+            try:
+                redis_client = aioredis.from_url(config.redis_url)
+                await redis_client.ping()
+                asyncio.create_task(redis_subscriber_task())
+                logger.info("Redis event channel connected")
+            except Exception as e:
+                logger.error(f"Redis unavailable, events stay process-local: {e}")
+                redis_client = None
+
+        # Create email processor (but don't start it yet). Construction is
+        # done off-loop so component setup can't delay serving the first
+        # requests after boot.
         if config:
             global email_processor
-            email_processor = EmailProcessor(config)
+            email_processor = await asyncio.to_thread(EmailProcessor, config)
             logger.info("Email processor initialized")
         
     except Exception as e:
@@ -483,11 +641,19 @@ async def shutdown_event():
 app.mount("/static", StaticFiles(directory="."), name="static")
 
 if __name__ == "__main__":
-    # Run the server
+    # uvloop's selector/protocol implementation is written in Cython and
+    # roughly halves event-loop overhead; fall back to asyncio on platforms
+    # where it is unavailable (e.g. Windows).
+    if uvloop is not None:
+        uvloop.install()
+
+    # Run the server. More than one worker needs REDIS_URL configured so
+    # WebSocket events fan out across processes.
     uvicorn.run(
         "server:app",
         host="0.0.0.0",
         port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
         reload=False,
         log_level="info"
     )
@@ -3,95 +3,55 @@ Urgency Classifier - Uses OpenAI to classify email urgency
 """
 
 import asyncio
+import hashlib
 import logging
-import json
+import re
+import time
+from collections import OrderedDict
 from typing import Optional
+import httpx
 import openai
+import orjson
 from openai import AsyncOpenAI
 
 from config import Config
 from models import EmailMessage, UrgencyLevel
 
+# One AsyncOpenAI client per API key, shared across classifier instances so
+# TLS handshakes and the HTTP/2 connection pool are reused instead of being
+# rebuilt each time a classifier is constructed (e.g. /api/test-connections
+# creates a throwaway instance per request).
+_CLIENT_CACHE: dict = {}
 
-class UrgencyClassifier:
-    """AI-powered email urgency classifier using OpenAI"""
-    
-    def __init__(self, config: Config):
-        self.config = config
-        self.logger = logging.getLogger(__name__)
-        self.client = AsyncOpenAI(api_key=config.openai_api_key)
-        self.is_connected = False
-    
-    async def test_connection(self):
-        """Test OpenAI API connection"""
-        try:
-            # Test with a simple completion
-            response = await self.client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=[
-                    {"role": "user", "content": "Hello, this is a connection test."}
-                ],
-                max_tokens=10
-            )
-            
-            self.is_connected = True
-            self.logger.info("OpenAI connection test successful")
-            
-        except Exception as e:
-            self.logger.error(f"OpenAI connection test failed: {e}")
-            self.is_connected = False
-            raise
-    
-    async def classify_urgency(self, email_msg: EmailMessage) -> UrgencyLevel:
-        """Classify email urgency using AI"""
-        try:
-            self.logger.info(f"Classifying urgency for email: {email_msg.message_id}")
-            
-            # Prepare the prompt
-            prompt = self._create_urgency_prompt(email_msg)
-            
-            # Call OpenAI API
-            response = await self.client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert email urgency classifier. Analyze emails and determine their urgency level on a scale of 1-5."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=200,
-                temperature=0.1,
-                response_format={"type": "json_object"}
+
+def _get_client(api_key: str) -> AsyncOpenAI:
+    """Return the pooled AsyncOpenAI client for this API key"""
+    client = _CLIENT_CACHE.get(api_key)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=httpx.Timeout(60.0, connect=10.0)
             )
-            
-            # Parse response
-            result = json.loads(response.choices[0].message.content)
-            urgency_score = result.get('urgency', 3)
-            reasoning = result.get('reasoning', 'No reasoning provided')
-            
-            # Validate urgency score
-            if not isinstance(urgency_score, int) or not 1 <= urgency_score <= 5:
-                self.logger.warning(f"Invalid urgency score {urgency_score}, defaulting to 3")
-                urgency_score = 3
-            
-            urgency = UrgencyLevel(urgency_score)
-            
-            self.logger.info(f"Email urgency classified as {urgency} ({urgency_score}/5). Reasoning: {reasoning}")
-            
-            return urgency
-            
-        except Exception as e:
-            self.logger.error(f"Error classifying urgency for {email_msg.message_id}: {e}")
-            # Return medium urgency as fallback
-            return UrgencyLevel.MEDIUM
-    
-    def _create_urgency_prompt(self, email_msg: EmailMessage) -> str:
-        """Create prompt for urgency classification"""
-        return f"""
+        )
+        _CLIENT_CACHE[api_key] = client
+    return client
+
+# Local prefilter: mail that announces itself as bulk or automatic carries
+# unambiguous markers, so it is classified without an API call; anything
+# without a clear marker escalates to OpenAI as before.
+_BULK_HEADERS = ('list-unsubscribe', 'list-id')
+_BULK_PRECEDENCE = ('bulk', 'list', 'junk')
+_AUTOREPLY_RE = re.compile(
+    r'\b(out of (the )?office|auto[- ]?reply|automatic reply|on vacation)\b', re.IGNORECASE)
+_BULK_SUBJECT_RE = re.compile(
+    r'\b(newsletter|unsubscribe|order confirmation|your receipt|your invoice)\b', re.IGNORECASE)
+
+# Prompt templates are assembled once at import; per-email fields are slotted
+# in with str.format so the large literals are not rebuilt on every call.
+_URGENCY_TEMPLATE = """
 Analyze the following email and determine its urgency level on a scale of 1-5.
 
 URGENCY SCALE:
@@ -102,12 +62,12 @@ URGENCY SCALE:
 5 - Urgent: Critical issues, security concerns, immediate action required
 
 EMAIL DETAILS:
-From: {email_msg.sender}
-Subject: {email_msg.subject}
-Received: {email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S')}
+From: {sender}
+Subject: {subject}
+Received: {received}
 
 EMAIL CONTENT:
-{email_msg.body}
+{body}
 
 Please respond with a JSON object containing:
 - "urgency": integer from 1-5
@@ -123,71 +83,16 @@ Consider factors like:
 - Request complexity
 - Security implications
 """
-    
-    async def classify_batch(self, emails: list[EmailMessage]) -> list[tuple[EmailMessage, UrgencyLevel]]:
-        """Classify urgency for multiple emails in batch"""
-        try:
-            self.logger.info(f"Classifying urgency for {len(emails)} emails")
-            
-            # Create batch prompt
-            batch_prompt = self._create_batch_prompt(emails)
-            
-            # Call OpenAI API
-            response = await self.client.chat.completions.create(
-                model=self.config.openai_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert email urgency classifier. Analyze multiple emails and determine their urgency levels on a scale of 1-5."
-                    },
-                    {
-                        "role": "user",
-                        "content": batch_prompt
-                    }
-                ],
-                max_tokens=1000,
-                temperature=0.1,
-                response_format={"type": "json_object"}
-            )
-            
-            # Parse response
-            result = json.loads(response.choices[0].message.content)
-            classifications = result.get('classifications', [])
-            
-            # Map results back to emails
-            results = []
-            for i, email_msg in enumerate(emails):
-                if i < len(classifications):
-                    urgency_score = classifications[i].get('urgency', 3)
-                    if not isinstance(urgency_score, int) or not 1 <= urgency_score <= 5:
-                        urgency_score = 3
-                    urgency = UrgencyLevel(urgency_score)
-                else:
-                    urgency = UrgencyLevel.MEDIUM  # Default fallback
-                
-                results.append((email_msg, urgency))
-            
-            self.logger.info(f"Batch classification completed for {len(emails)} emails")
-            return results
-            
-        except Exception as e:
-            self.logger.error(f"Error in batch classification: {e}")
-            # Return default urgency for all emails
-            return [(email_msg, UrgencyLevel.MEDIUM) for email_msg in emails]
-    
-    def _create_batch_prompt(self, emails: list[EmailMessage]) -> str:
-        """Create prompt for batch urgency classification"""
-        email_list = []
-        for i, email_msg in enumerate(emails):
-            email_list.append(f"""
-EMAIL {i+1}:
-From: {email_msg.sender}
-Subject: {email_msg.subject}
-Content: {email_msg.body[:500]}{'...' if len(email_msg.body) > 500 else ''}
-""")
-        
-        return f"""
-Analyze the following {len(emails)} emails and determine their urgency levels on a scale of 1-5.
+
+_BATCH_EMAIL_TEMPLATE = """
+EMAIL {index}:
+From: {sender}
+Subject: {subject}
+Content: {content}
+"""
+
+_BATCH_PROMPT_TEMPLATE = """
+Analyze the following {count} emails and determine their urgency levels on a scale of 1-5.
 
 URGENCY SCALE:
 1 - Very Low: General inquiries, newsletters, promotional content
@@ -197,7 +102,7 @@ URGENCY SCALE:
 5 - Urgent: Critical issues, security concerns, immediate action required
 
 EMAILS:
-{''.join(email_list)}
+{emails}
 
 Please respond with a JSON object containing:
 - "classifications": array of objects, one for each email, containing:
@@ -206,6 +111,300 @@ Please respond with a JSON object containing:
   - "key_indicators": list of specific words/phrases
   - "suggested_action": recommended next step
 """
+
+
+class UrgencyClassifier:
+    """AI-powered email urgency classifier using OpenAI"""
+
+    # Micro-batching: concurrent classify_urgency() calls are coalesced into
+    # one batch prompt, trading up to BATCH_WINDOW_SECONDS of latency for a
+    # single API round trip instead of one per email.
+    BATCH_MAX = 16
+    BATCH_WINDOW_SECONDS = 0.05
+
+    # Classification cache: retries and duplicate sends carry the same
+    # subject/body, so their urgency is answered from memory instead of
+    # paying for another completion. Entries age out after an hour.
+    CACHE_MAX = 10_000
+    CACHE_TTL_SECONDS = 3600
+
+    # Urgency is decided in the first part of a message; anything past this
+    # only adds token cost and latency. ~4 chars per token for typical email
+    # text, so 6000 chars keeps the body near 1500 tokens.
+    BODY_MAX_CHARS = 6000
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self.client = _get_client(config.openai_api_key)
+        self._connected: bool = False
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        self._urgency_cache: OrderedDict = OrderedDict()
+        self._cache_hits = 0
+        self._local_classifications = 0
+    
+    async def test_connection(self):
+        """Test OpenAI API connection"""
+        try:
+            # Test with a simple completion
+            response = await self.client.chat.completions.create(
+                model=self.config.openai_model,
+                messages=[
+                    {"role": "user", "content": "Hello, this is a connection test."}
+                ],
+                max_tokens=10
+            )
+            
+            self._connected = True
+            self.logger.info("OpenAI connection test successful")
+            
+        except Exception as e:
+            self.logger.error(f"OpenAI connection test failed: {e}")
+            self._connected = False
+            raise
+    
+    async def classify_urgency(self, email_msg: EmailMessage) -> UrgencyLevel:
+        """Classify email urgency, coalescing concurrent requests into batches
+
+        The email is handed to a background consumer that drains whatever
+        arrives within the batching window into a single batch API call;
+        a lone email still goes through the ordinary single-email prompt.
+        Content seen within the last hour is answered from the cache
+        without touching the queue at all.
+        """
+        key = self._cache_key(email_msg)
+        cached = self._urgency_cache.get(key)
+        if cached is not None:
+            expires, urgency = cached
+            if time.monotonic() < expires:
+                self._urgency_cache.move_to_end(key)
+                self._cache_hits += 1
+                return urgency
+            del self._urgency_cache[key]
+
+        local = self._prefilter_urgency(email_msg)
+        if local is not None:
+            self._local_classifications += 1
+            self.logger.info(f"Email {email_msg.message_id} classified locally as {local} (bulk/auto markers)")
+            return local
+
+        self._ensure_batcher()
+        future = asyncio.get_running_loop().create_future()
+        await self._batch_queue.put((email_msg, future))
+        urgency, is_fallback = await future
+
+        # Fallback results (API errors answered with MEDIUM) are never
+        # cached: a transient outage must not pin the wrong urgency on
+        # this content for the full TTL.
+        if not is_fallback:
+            self._urgency_cache[key] = (time.monotonic() + self.CACHE_TTL_SECONDS, urgency)
+            while len(self._urgency_cache) > self.CACHE_MAX:
+                self._urgency_cache.popitem(last=False)
+        return urgency
+
+    @staticmethod
+    def _prefilter_urgency(email_msg: EmailMessage) -> Optional[UrgencyLevel]:
+        """Classify obviously-bulk or automatic mail locally, or return None
+
+        Only fires on unambiguous markers (list headers, Precedence: bulk,
+        auto-reply conventions); everything else goes to the model.
+        """
+        raw_headers = (email_msg.metadata or {}).get('raw_headers') or {}
+        headers = {k.lower(): str(v).strip().lower() for k, v in raw_headers.items()}
+
+        if any(h in headers for h in _BULK_HEADERS) or headers.get('precedence') in _BULK_PRECEDENCE:
+            return UrgencyLevel.VERY_LOW
+        if headers.get('auto-submitted', 'no') != 'no':
+            return UrgencyLevel.LOW
+        if _AUTOREPLY_RE.search(email_msg.subject):
+            return UrgencyLevel.LOW
+        if _BULK_SUBJECT_RE.search(email_msg.subject):
+            return UrgencyLevel.VERY_LOW
+        return None
+
+    @staticmethod
+    def _cache_key(email_msg: EmailMessage) -> bytes:
+        """Digest of the urgency-relevant content (subject plus body prefix)"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(email_msg.subject.encode('utf-8', 'replace'))
+        h.update(b'\x00')
+        h.update(email_msg.body[:2048].encode('utf-8', 'replace'))
+        return h.digest()
+
+    def _ensure_batcher(self):
+        """Start the batch consumer task on first use"""
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_queue = asyncio.Queue()
+            self._batch_task = asyncio.create_task(self._batch_consumer())
+
+    async def _batch_consumer(self):
+        """Drain queued classification requests and resolve their futures"""
+        while True:
+            email_msg, future = await self._batch_queue.get()
+            pending = [(email_msg, future)]
+            deadline = asyncio.get_running_loop().time() + self.BATCH_WINDOW_SECONDS
+            while len(pending) < self.BATCH_MAX:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._batch_queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Futures resolve to (urgency, is_fallback) so classify_urgency
+            # can tell real classifications from error placeholders.
+            try:
+                if len(pending) == 1:
+                    results = [(pending[0][0], await self._classify_one(pending[0][0]))]
+                else:
+                    results = await self._classify_batch([email_msg for email_msg, _ in pending])
+                for (_, fut), (_, urgency) in zip(pending, results):
+                    if not fut.done():
+                        fut.set_result((urgency, False))
+            except Exception as e:
+                self.logger.error(f"Error in classification batch consumer: {e}")
+                for _, fut in pending:
+                    if not fut.done():
+                        fut.set_result((UrgencyLevel.MEDIUM, True))
+
+    async def aclose(self):
+        """Stop the batch consumer task"""
+        if self._batch_task is not None:
+            self._batch_task.cancel()
+            self._batch_task = None
+
+    async def _classify_one(self, email_msg: EmailMessage) -> UrgencyLevel:
+        """Classify a single email's urgency using AI
+
+        API errors propagate to the caller (the batch consumer), which
+        resolves the waiting futures with an uncached fallback.
+        """
+        self.logger.info(f"Classifying urgency for email: {email_msg.message_id}")
+
+        # Prepare the prompt
+        prompt = self._create_urgency_prompt(email_msg)
+
+        # Call OpenAI API
+        response = await self.client.chat.completions.create(
+            model=self.config.openai_model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are an expert email urgency classifier. Analyze emails and determine their urgency level on a scale of 1-5."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            max_tokens=200,
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+
+        # Parse response
+        result = orjson.loads(response.choices[0].message.content)
+        urgency_score = result.get('urgency', 3)
+        reasoning = result.get('reasoning', 'No reasoning provided')
+
+        # Validate urgency score
+        if not isinstance(urgency_score, int) or not 1 <= urgency_score <= 5:
+            self.logger.warning(f"Invalid urgency score {urgency_score}, defaulting to 3")
+            urgency_score = 3
+
+        urgency = UrgencyLevel(urgency_score)
+
+        self.logger.info(f"Email urgency classified as {urgency} ({urgency_score}/5). Reasoning: {reasoning}")
+
+        return urgency
+    
+    def _create_urgency_prompt(self, email_msg: EmailMessage) -> str:
+        """Create prompt for urgency classification"""
+        return _URGENCY_TEMPLATE.format(
+            sender=email_msg.sender,
+            subject=email_msg.subject,
+            received=email_msg.received_at.strftime('%Y-%m-%d %H:%M:%S'),
+            body=self._truncate_body(email_msg.body)
+        )
+
+    @classmethod
+    def _truncate_body(cls, body: str) -> str:
+        """Cap the email body at BODY_MAX_CHARS, cutting on a line boundary"""
+        if len(body) <= cls.BODY_MAX_CHARS:
+            return body
+        cut = body.rfind('\n', cls.BODY_MAX_CHARS // 2, cls.BODY_MAX_CHARS)
+        if cut == -1:
+            cut = cls.BODY_MAX_CHARS
+        return f"{body[:cut]}\n[... truncated ...]"
+    
+    async def classify_batch(self, emails: list[EmailMessage]) -> list[tuple[EmailMessage, UrgencyLevel]]:
+        """Classify urgency for multiple emails in batch"""
+        try:
+            return await self._classify_batch(emails)
+        except Exception as e:
+            self.logger.error(f"Error in batch classification: {e}")
+            # Return default urgency for all emails
+            return [(email_msg, UrgencyLevel.MEDIUM) for email_msg in emails]
+
+    async def _classify_batch(self, emails: list[EmailMessage]) -> list[tuple[EmailMessage, UrgencyLevel]]:
+        """Batch classification core; API errors propagate to the caller"""
+        self.logger.info(f"Classifying urgency for {len(emails)} emails")
+
+        # Create batch prompt
+        batch_prompt = self._create_batch_prompt(emails)
+
+        # Call OpenAI API
+        response = await self.client.chat.completions.create(
+            model=self.config.openai_model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are an expert email urgency classifier. Analyze multiple emails and determine their urgency levels on a scale of 1-5."
+                },
+                {
+                    "role": "user",
+                    "content": batch_prompt
+                }
+            ],
+            max_tokens=1000,
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+
+        # Parse response
+        result = orjson.loads(response.choices[0].message.content)
+        classifications = result.get('classifications', [])
+
+        # Map results back to emails
+        results = []
+        for i, email_msg in enumerate(emails):
+            if i < len(classifications):
+                urgency_score = classifications[i].get('urgency', 3)
+                if not isinstance(urgency_score, int) or not 1 <= urgency_score <= 5:
+                    urgency_score = 3
+                urgency = UrgencyLevel(urgency_score)
+            else:
+                urgency = UrgencyLevel.MEDIUM  # Default fallback
+
+            results.append((email_msg, urgency))
+
+        self.logger.info(f"Batch classification completed for {len(emails)} emails")
+        return results
+    
+    def _create_batch_prompt(self, emails: list[EmailMessage]) -> str:
+        """Create prompt for batch urgency classification"""
+        email_list = [
+            _BATCH_EMAIL_TEMPLATE.format(
+                index=i + 1,
+                sender=email_msg.sender,
+                subject=email_msg.subject,
+                content=f"{email_msg.body[:500]}{'...' if len(email_msg.body) > 500 else ''}"
+            )
+            for i, email_msg in enumerate(emails)
+        ]
+        return _BATCH_PROMPT_TEMPLATE.format(count=len(emails), emails=''.join(email_list))
     
     async def get_urgency_explanation(self, email_msg: EmailMessage, urgency: UrgencyLevel) -> str:
         """Get detailed explanation for urgency classification"""
@@ -247,8 +446,14 @@ Provide a detailed explanation including:
             self.logger.error(f"Error getting urgency explanation: {e}")
             return f"Urgency level {urgency.value}/5 - Detailed explanation unavailable due to error."
     
-    async def is_connected(self) -> bool:
-        """Check if OpenAI API is accessible"""
+    async def check_connection(self) -> bool:
+        """Check if OpenAI API is accessible
+
+        Named check_connection (matching the other components) so it can't
+        shadow the _connected flag: the old async is_connected method
+        collided with the bool attribute of the same name, making
+        await classifier.is_connected() raise on instances.
+        """
         try:
             # Simple test call
             response = await self.client.chat.completions.create(
@@ -256,17 +461,22 @@ Provide a detailed explanation including:
                 messages=[{"role": "user", "content": "test"}],
                 max_tokens=1
             )
+            self._connected = True
             return True
         except Exception as e:
             self.logger.warning(f"OpenAI connection check failed: {e}")
+            self._connected = False
             return False
     
     def get_classification_stats(self) -> dict:
         """Get classification statistics"""
         return {
             'model': self.config.openai_model,
-            'is_connected': self.is_connected,
+            'is_connected': self._connected,
             'api_key_configured': bool(self.config.openai_api_key),
+            'cache_size': len(self._urgency_cache),
+            'cache_hits': self._cache_hits,
+            'local_classifications': self._local_classifications,
             'last_classification': None  # Could track this if needed
         }
 